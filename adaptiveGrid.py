@@ -0,0 +1,211 @@
+# Adaptive sampling of a function of one variable, for plots and integrals
+#
+# A fixed np.linspace spends as many points on the flat parts of a function as on its kinks, poles and sharp
+# nodes. Here we start from a coarse grid and keep halving only where the function needs it. The grid is made
+# of panels [x_l, x_r] with the value at the midpoint x_m known as well. Each round makes one call of f on the
+# quarter points of all the panels at once (so f must work on arrays), and either
+#   for plots     - accepts the panel if the midpoint and both quarter points are within threshold of the
+#                   straight line through the ends, so the drawn line is within about threshold of the function
+#                   (the midpoint alone isn't enough: on a sine, a panel centred on a node passes that test)
+#   for integrals - accepts the panel if Simpson's rule on the 5 points agrees with Simpson's rule on the 3 to
+#                   within 15 tol h/(b-a) (the usual adaptive Simpson test, with the error shared out by width)
+# or splits it into its two halves, which are panels with all three values already known. Every point that
+# has been evaluated ends up in the returned grid, so nothing is evaluated twice.
+#
+# None of these tests can see wiggles much narrower than a panel, so the starting grid has to resolve the
+# function first: resolvedGrid keeps halving every panel of it until that no longer turns up any new turning
+# points (local maxima or minima). A high n state aliased onto 64 points looks like a much slower wave, and
+# it takes a few halvings before all of its peaks show up.
+#
+# Known breakpoints (kinks or jumps, e.g. the 0, a and b of psiq4) are always grid points, and the function
+# is also sampled one rounding step either side of each of them so that both one-sided limits of a jump are
+# drawn. Poles and any jumps we weren't told about end up refined down to minWidth, which only costs a couple
+# of points per halving. For plots of functions with poles, clip is the largest |f| that matters (e.g. the
+# y-axis limit), and values beyond it count as equal to it when testing.
+
+import numpy as np  #import the numpy library as np
+
+
+#The starting grid, with the (count) points shared out between the segments between the breakpoints by length.
+#Inner breakpoints appear three times: one rounding step to the left, exactly, and one rounding step to the right
+def initialGrid(a,b,breaks=(),count=64):
+    edges=[a]+sorted(float(c) for c in breaks if a<c<b)+[b]
+    pieces=[]
+    for i in range(len(edges)-1):
+        left,right=edges[i],edges[i+1]
+        n=max(2,int(round(count*(right-left)/(b-a)))+1)
+        segment=np.linspace(left,right,n)
+        if i>0:
+            segment[0]=np.nextafter(left,right)
+        if i<len(edges)-2:
+            segment[-1]=np.nextafter(right,left)
+        pieces.append(segment)
+        if i<len(edges)-2:
+            pieces.append([right])
+    return np.concatenate(pieces)
+
+
+#Simpson's rule on the panels (left,mid,right)
+def simpson(left,right,yLeft,yMid,yRight):
+    return (right-left)*(yLeft+4*yMid+yRight)/6
+
+
+#Refine the grid x (with f values y, worked out if not given) panel by panel, see the top of the file.
+#  rule      - "plot" or "integral"
+#  threshold - the largest deviation from a straight line ("plot") or the allowed error per unit length
+#              ("integral")
+#  yMid      - the f values at the midpoints of the intervals wider than minWidth, if they are already known
+#Returns the sorted x values, the matching f values (every point f was evaluated at) and the integral of f over
+#the grid. Intervals narrower than minWidth are never split, and once maxPoints evaluations have been used
+#the remaining panels are accepted as they are
+def refineGrid(f,x,threshold,rule="plot",y=None,clip=np.inf,minWidth=0.0,maxPoints=100000,yMid=None):
+    x=np.asarray(x,dtype=float)
+    y=np.asarray(f(x),dtype=float) if y is None else y
+    doneX=[x]  #Every point evaluated so far
+    doneY=[y]
+
+    def evaluate(points):
+        values=np.asarray(f(points),dtype=float)
+        doneX.append(points)
+        doneY.append(values)
+        return values
+
+    narrow=np.diff(x)<=minWidth  #e.g. the rounding steps either side of a breakpoint, used as they are
+    integral=np.sum(np.diff(x)[narrow]*(y[:-1][narrow]+y[1:][narrow]))/2
+    left,right,yLeft,yRight=x[:-1][~narrow],x[1:][~narrow],y[:-1][~narrow],y[1:][~narrow]
+    mid=0.5*(left+right)
+    if yMid is None:
+        yMid=evaluate(mid)
+    else:
+        doneX.append(mid)
+        doneY.append(yMid)
+
+    while left.size:
+        final=(mid-left)<=minWidth
+        room=max(maxPoints-sum(v.size for v in doneX),0)//2  #How many panels can still be split or tested
+        if np.count_nonzero(~final)>room:  #Test the widest panels and accept the rest as they are
+            order=np.argsort(right-left)[::-1]
+            final[order[room:]]=True
+        integral+=np.sum(simpson(left[final],right[final],yLeft[final],yMid[final],yRight[final]))
+        test=~final
+        left,right,mid=left[test],right[test],mid[test]
+        yLeft,yRight,yMid=yLeft[test],yRight[test],yMid[test]
+        if not left.size:
+            break
+
+        yQuarters=evaluate(np.concatenate([0.5*(left+mid),0.5*(mid+right)]))
+        yFirst,ySecond=yQuarters[:left.size],yQuarters[left.size:]
+        coarse=simpson(left,right,yLeft,yMid,yRight)
+        fine=simpson(left,mid,yLeft,yFirst,yMid)+simpson(mid,right,yMid,ySecond,yRight)
+        if rule=="plot":  #Split where any of the three inner points is off the straight line through the ends
+            cLeft,cRight=np.clip(yLeft,-clip,clip),np.clip(yRight,-clip,clip)
+            with np.errstate(invalid="ignore"):  #nan values are never refined
+                split=np.zeros(left.size,dtype=bool)
+                for t,values in ((0.25,yFirst),(0.5,yMid),(0.75,ySecond)):
+                    split|=np.abs(np.clip(values,-clip,clip)-(cLeft+t*(cRight-cLeft)))>threshold
+            integral+=np.sum(fine[~split])
+        else:  #Split where Simpson's rule on 5 points disagrees with it on 3
+            with np.errstate(invalid="ignore"):
+                split=np.abs(fine-coarse)>15*threshold*(right-left)
+            integral+=np.sum((fine+(fine-coarse)/15)[~split])  #Richardson extrapolation of the accepted panels
+
+        #Each split panel becomes its two halves, whose midpoints are the quarter points
+        left,right=np.concatenate([left[split],mid[split]]),np.concatenate([mid[split],right[split]])
+        yLeft,yRight=np.concatenate([yLeft[split],yMid[split]]),np.concatenate([yMid[split],yRight[split]])
+        mid=0.5*(left+right)
+        yMid=np.concatenate([yFirst[split],ySecond[split]])
+
+    x=np.concatenate(doneX)
+    y=np.concatenate(doneY)
+    order=np.argsort(x,kind="stable")
+    return x[order],y[order],float(integral)
+
+
+#The number of turning points (sign changes of the slope) in the samples y, after clipping to +-clip
+def turningPoints(y,clip=np.inf):
+    slope=np.diff(np.clip(y,-clip,clip))
+    slope=np.sign(slope[np.isfinite(slope)&(slope!=0)])
+    return int(np.count_nonzero(slope[1:]!=slope[:-1]))
+
+
+#initialGrid, with every panel halved until that stops turning up new turning points (or the grid would take
+#more than maxPoints/4 points, leaving the rest for refineGrid). Returns the grid, the f values on it and the f
+#values at the midpoints of its panels wider than minWidth from the halving that found nothing new (the yMid of
+#refineGrid, None if the budget ran out first)
+def resolvedGrid(f,a,b,breaks=(),count=64,clip=np.inf,minWidth=0.0,maxPoints=100000):
+    x=initialGrid(a,b,breaks,count)
+    y=np.asarray(f(x),dtype=float)
+    turns=turningPoints(y,clip)
+    while True:
+        wide=np.diff(x)>minWidth  #Not the rounding steps either side of a breakpoint
+        if x.size+np.count_nonzero(wide)>maxPoints//4:
+            return x,y,None
+        mid=0.5*(x[:-1]+x[1:])[wide]
+        yMid=np.asarray(f(mid),dtype=float)
+        newX,newY=np.concatenate([x,mid]),np.concatenate([y,yMid])
+        order=np.argsort(newX,kind="stable")
+        newTurns=turningPoints(newY[order],clip)
+        if newTurns<=turns:
+            return x,y,yMid
+        x,y,turns=newX[order],newY[order],newTurns
+
+
+#Sample f on [a,b] finely enough for a plot. tol is the largest allowed deviation from a straight line between
+#neighbouring points, as a fraction of the range of f on the starting grid (after clipping to +-clip).
+#Returns (x, f(x)) on a sorted grid
+def adaptiveSample(f,a,b,breaks=(),tol=1e-3,initial=64,clip=np.inf,maxPoints=100000):
+    x,y,yMid=resolvedGrid(f,a,b,breaks,initial,clip,(b-a)*1e-9,maxPoints)
+    clipped=np.clip(np.concatenate([y,yMid if yMid is not None else []]),-clip,clip)
+    scale=np.nanmax(clipped)-np.nanmin(clipped)
+    scale=scale if scale>0 else 1.0
+    x,y,integral=refineGrid(f,x,tol*scale,"plot",y,clip,minWidth=(b-a)*1e-9,maxPoints=maxPoints,yMid=yMid)
+    return x,y
+
+
+#The integral of f from a to b to an absolute accuracy of about tol by adaptive Simpson's rule.
+#Returns (integral, number of evaluations of f)
+def adaptiveIntegrate(f,a,b,breaks=(),tol=1e-10,initial=16,maxPoints=100000):
+    x,y,yMid=resolvedGrid(f,a,b,breaks,initial,maxPoints=maxPoints)
+    x,y,integral=refineGrid(f,x,tol/(b-a),"integral",y,maxPoints=maxPoints,yMid=yMid)
+    return integral,x.size
+
+
+#The largest gap between the straight lines drawn through (x,y) and f itself, measured on a fine grid of points
+#points and as a fraction of the range of f (after clipping to +-clip). Panels where skip(y) is True (e.g. the
+#jump across a pole, which the plot leaves out) are ignored
+def interpolationError(f,x,y,clip=np.inf,points=2*10**6,skip=None):
+    fine=np.linspace(x[0],x[-1],points)
+    exact=np.clip(np.asarray(f(fine),dtype=float),-clip,clip)
+    drawn=np.interp(fine,x,np.clip(y,-clip,clip))
+    error=np.abs(drawn-exact)
+    if skip is not None:
+        panel=np.clip(np.searchsorted(x,fine,side="right")-1,0,x.size-2)
+        error[skip(y)[panel]]=0
+    return np.nanmax(error)/(np.nanmax(exact)-np.nanmin(exact))
+
+
+#Check adaptiveSample against tol on oscillatory functions: infinite well states up to n=100 on the range of the
+#infiniteSquareWell.py plots, and the finite well LHS and RHS scans of finiteSquareWell.py with their poles. Each
+#is compared with a uniform grid of the same number of points
+def validateAdaptive(tol=1e-3):
+    import scipy.constants  #Only needed here
+    from wavefunctions import infinitePsi
+    m=scipy.constants.electron_mass
+    hbar,eV=scipy.constants.hbar,scipy.constants.eV
+    cases=[("infinitePsi n=%d"%n,lambda x,n=n: infinitePsi(x,n),-0.25,1.25,[0,1],np.inf,None)
+           for n in (1,5,20,30,50,100)]
+    with np.errstate(all="ignore"):
+        cases+=[("finite well LHS",lambda E: 2*np.sqrt((25-E)*E)/(2*E-25),0.5,25,(),10,
+                 lambda y: np.append(np.diff(y)>0,False)),
+                ("finite well RHS",lambda E: np.tan(np.sqrt(2*m*E*eV/hbar**2)*0.5e-9),0.5,25,(),10,
+                 lambda y: np.append(np.diff(y)<0,False))]
+        print("%-18s %8s %14s %14s"%("function","points","adaptive error","uniform error"))
+        for name,f,a,b,breaks,clip,skip in cases:
+            x,y=adaptiveSample(f,a,b,breaks,tol=tol,clip=clip)
+            uniform=np.linspace(a,b,x.size)
+            errors=[interpolationError(f,grid,f(grid),clip,skip=skip) for grid in (x,uniform)]
+            print("%-18s %8d %14.2e %14.2e"%(name,x.size,errors[0],errors[1]))
+
+
+if __name__=="__main__":
+    validateAdaptive()
@@ -0,0 +1,175 @@
+# Render lots of figures headless, spread over a pool of processes
+#
+# The notebooks draw one figure per cell with plt.subplots(). For regenerating thousands of variants that is
+# slow: every figure is built from scratch, and everything happens in one process. Here each plot recipe is a
+# pair of functions
+#   setup()              - build the figure once and return (fig, artists)
+#   update(artists,**p)  - put the data for one parameter set into the existing artists
+# so each worker process builds each kind of figure once and then only swaps the data of the Line2D or
+# AxesImage artists before every savefig. Jobs are (recipe name, parameters, filename) triples, grouped by
+# recipe and handed out in chunks to a ProcessPoolExecutor, so the run time scales with the number of cores.
+#
+# Run it as
+#   python batchRender.py outputDirectory [--workers N]
+# to render the standard set from defaultJobs, or call renderJobs with your own list.
+
+import matplotlib
+matplotlib.use("Agg")  #No display needed, this must come before pyplot is imported
+import matplotlib.pyplot as plt #import the pyplot library as plt
+import numpy as np  #import the numpy library as np
+import os  #Import os for the output paths
+import math  #Import math so that math.pi can be used
+import argparse  #Import argparse for the command line
+import concurrent.futures  #Import concurrent.futures for the process pool
+import scipy.constants #Import scipy.constants so that hbar and electron_mass can be used
+
+from finiteWell import findBoundStates, boundStatePsi  #Finite well energies and normalised states
+from hydrogen import radialPsi  #Hydrogen radial wavefunctions
+from hydrogenGrid import densitySlab  #Hydrogen density on a plane
+from wavefunctions import infinitePsi  #Infinite well states
+
+
+# ### The recipes
+# Each setup makes the figure the same way the notebook cell does, with fixed axis limits so that update only
+# has to change the data and the title.
+
+def infiniteWellSetup():
+    fig, ax = plt.subplots()
+    line, = ax.plot([], [], linewidth=3)
+    ax.set_xlim(-0.25, 1.25)
+    ax.set_ylim(-1.5, 1.5)
+    ax.set_xlabel("$x / L$")
+    ax.set_ylabel("$\\psi(x) * \\sqrt{L}$")
+    return fig, (ax, line)
+
+#The n-th infinite well state
+def infiniteWellUpdate(artists, n, points=1000):
+    ax, line = artists
+    x = np.linspace(-0.25, 1.25, points)
+    line.set_data(x, infinitePsi(x, n))
+    ax.set_title("Infinite Square Well, n="+str(n))
+
+
+def finiteWellSetup():
+    fig, ax = plt.subplots()
+    line, = ax.plot([], [], linewidth=1)
+    walls = [ax.axvline(x=0, linestyle=":", color="black"), ax.axvline(x=0, linestyle=":", color="black")]
+    ax.set_xlabel(r"$x$ (m)")
+    ax.set_ylabel(r"$\rho(x)$")
+    return fig, (ax, line, walls)
+
+#The probability density of the n-th bound state (n=1,2,...) of the well U (eV), L (m), as finitePDF
+def finiteWellUpdate(artists, U, L, n, m=scipy.constants.electron_mass, points=1000):
+    ax, line, walls = artists
+    E = findBoundStates(U, L, m)[n-1]
+    x = np.linspace(-L, 2*L, points)
+    rho = boundStatePsi(x, E, U, L, m)**2
+    line.set_data(x, rho)
+    walls[1].set_xdata([L, L])
+    ax.set_xlim(x[0], x[-1])
+    ax.set_ylim(0, 1.05*rho.max())
+    ax.set_title("Finite Square Well, U="+str(U)+"eV, n="+str(n))
+
+
+def hydrogenRadialSetup():
+    fig, ax = plt.subplots()
+    line, = ax.plot([], [], linewidth=3)
+    ax.set_xlabel(r"$r (a_0)$")
+    ax.set_ylabel(r"r^2 $\rho(r)$")
+    return fig, (ax, line)
+
+#The radial probability density r^2 R_nl^2 out to rMax Bohr radii
+def hydrogenRadialUpdate(artists, n, l, rMax=None, points=1000):
+    ax, line = artists
+    rMax = 2.5*n*n+10 if rMax is None else rMax  #Far enough out for the outermost lobe
+    r = np.linspace(0, rMax, points)
+    rho = r**2*radialPsi(r, n, l)**2
+    line.set_data(r, rho)
+    ax.set_xlim(0, rMax)
+    ax.set_ylim(0, 1.05*rho.max())
+    ax.set_title("Hydrogen Radial Probability Density for n="+str(n)+", l="+str(l))
+
+
+def hydrogenSliceSetup():
+    fig, ax = plt.subplots()
+    image = ax.imshow(np.zeros((2, 2)), interpolation="none", origin="lower")
+    ax.set_xlabel(r"$x (a_0)$")
+    ax.set_ylabel(r"$z (a_0)$")
+    return fig, (ax, image)
+
+#The density in the x-z plane (y=0), as the densityCube slice at the end of hydrogenWavefunction.py
+def hydrogenSliceUpdate(artists, n, l, m, plotMax=30, points=300):
+    ax, image = artists
+    axis = np.linspace(-plotMax, plotMax, points)
+    rho = densitySlab(axis, np.zeros(1), axis, n, l, m)[:, 0, :]  #rho[iz,ix]
+    image.set_data(rho)
+    image.set_extent([-plotMax, plotMax, -plotMax, plotMax])
+    image.set_clim(0, rho.max())
+    ax.set_title("Hydrogen Probability Density for n="+str(n)+", l="+str(l)+", m="+str(m)+" at y=0")
+
+
+recipes = {"infiniteWell": (infiniteWellSetup, infiniteWellUpdate),
+           "finiteWell": (finiteWellSetup, finiteWellUpdate),
+           "hydrogenRadial": (hydrogenRadialSetup, hydrogenRadialUpdate),
+           "hydrogenSlice": (hydrogenSliceSetup, hydrogenSliceUpdate)}
+
+
+# ### Running the jobs
+
+#The figures this process has built so far, one per recipe
+figureCache = {}
+
+#Render a list of (recipe, params, filename) jobs in this process, reusing one figure per recipe.
+#Returns the number of figures written
+def renderChunk(jobs, dpi=150):
+    for name, params, filename in jobs:
+        if name not in figureCache:
+            setup, update = recipes[name]
+            figureCache[name] = setup()
+        fig, artists = figureCache[name]
+        recipes[name][1](artists, **params)
+        fig.savefig(filename, dpi=dpi)
+    return len(jobs)
+
+
+#Render every job, using workers processes (default: one per core).
+#Jobs of the same recipe are kept together so each worker builds as few figures as possible, and the chunks
+#are small enough that every worker gets several of them, which evens out slow and fast recipes
+def renderJobs(jobs, workers=None, dpi=150, chunksPerWorker=4):
+    workers = os.cpu_count() if workers is None else workers
+    jobs = sorted(jobs, key=lambda job: job[0])
+    if workers <= 1:
+        return renderChunk(jobs, dpi)
+    chunk = max(1, math.ceil(len(jobs)/(workers*chunksPerWorker)))
+    chunks = [jobs[i:i+chunk] for i in range(0, len(jobs), chunk)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(renderChunk, chunks, [dpi]*len(chunks)))
+
+
+#The standard set: the first 20 infinite well states, every bound state of a range of finite wells and the
+#hydrogen radial densities and slices for n up to nMax
+def defaultJobs(directory, nMax=6, wellDepths=(5, 10, 25, 50, 100)):
+    jobs = []
+    for n in range(1, 21):
+        jobs.append(("infiniteWell", {"n": n}, os.path.join(directory, "infinite_n%d.png" % n)))
+    for U in wellDepths:
+        count = len(findBoundStates(U, 0.5e-9, scipy.constants.electron_mass))
+        for n in range(1, count+1):
+            jobs.append(("finiteWell", {"U": U, "L": 0.5e-9, "n": n},
+                         os.path.join(directory, "finite_U%g_n%d.png" % (U, n))))
+    for n in range(1, nMax+1):
+        for l in range(n):
+            jobs.append(("hydrogenRadial", {"n": n, "l": l}, os.path.join(directory, "radial_%d_%d.png" % (n, l))))
+            for m in range(-l, l+1):
+                jobs.append(("hydrogenSlice", {"n": n, "l": l, "m": m, "plotMax": 4*n*n+6},
+                             os.path.join(directory, "slice_%d_%d_%d.png" % (n, l, m))))
+    return jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the standard set of figures without a display")
+    parser.add_argument("directory", help="where to write the png files")
+    parser.add_argument("--workers", type=int, default=None, help="number of processes (default: one per core)")
+    args = parser.parse_args()
+    os.makedirs(args.directory, exist_ok=True)
+    print("Wrote", renderJobs(defaultJobs(args.directory), args.workers), "figures to", args.directory)
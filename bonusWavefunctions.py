@@ -24,6 +24,10 @@ import matplotlib.pyplot as plt #import the pyplot library as plt
 import matplotlib.style #Some style nonsense
 import matplotlib as mpl #Some more style nonsense
 import math 
+from fastPiecewise import piecewiseEval #A faster version of np.piecewise
+from wavefunctions import cos2pixoverLRegions, psiq3a, psiq3b, psiq3c, psiq3d, psiq3e, psiq4Regions, psiq4 #The question wavefunctions, shared with the other scripts
+from adaptiveGrid import adaptiveSample, adaptiveIntegrate #Adaptive grids for plots and integrals
+from observables import observables, regionMoments #Norm, <x>, <p>, uncertainties and probabilities in one go
 
 #Set default figure size
 #mpl.rcParams['figure.figsize'] = [12.0, 8.0] #Inches... of course it is inches
@@ -41,14 +45,13 @@ mpl.rcParams['figure.dpi']=150 # dots per inch
 # 0 & \text{otherwise}
 # \end{cases}$$
 #
-# We will use the python numpy library to code up this function using the piecewise method. Note that the $x$ below will refer to an array of numbers rather than just a single number, which means we have to be careful how we define the conditions and the function.
+# We will code up this function piecewise with piecewiseEval, a faster version of the numpy piecewise method. Note that the $x$ below will refer to an array of numbers rather than just a single number, so rather than testing a condition for each region we give the breakpoints between the regions, which region each breakpoint belongs to, and a function (or a constant) for each region.
 
 #Define a function which will operate on an array of x values all at once
-def cos2pixoverL(A,x,L):
-    conds = [x < -L/4, (x >= -L/4) & (x <= L/4), x > L/4]   #The three regions of x
-    funcs = [lambda x: 0, lambda x: A*np.cos(2*math.pi*x/L),  # sin(pi x) in the middle and 0 outsides
-            lambda x: 0]  #the lambda keyword is allowing us to define a quick function
-    return np.piecewise(x, conds, funcs)  #Now do the piecewise calculation and return it
+#cos2pixoverLRegions (from wavefunctions.py) gives the regions: the breaks -L/4 and L/4 split x into x<-L/4,
+#-L/4<=x<=L/4 and x>L/4, and the functions are 0, A cos(2 pi x/L) and 0
+def cos2pixoverL(A,x,L,out=None):
+    return piecewiseEval(x, *cos2pixoverLRegions(A,L), out=out)  #Now do the piecewise calculation and return it
 
 
 #Now we will use the linspace function to get 100 numbers
@@ -112,9 +115,10 @@ ax.grid() # Draw a grid
 # We can also use the computer to check if we got the normalistion correct.
 
 # The integral is just the area under the curve.
-# numpy.trapz uses the trapezium rule to calculate the area under the curve
-norm=np.trapz(cos2pixoverL(A,x,L)**2,dx=x[1]-x[0])
-print("Did we normalise the wavefunction?\nN=",norm)
+# observables uses Gauss-Legendre quadrature between the corners at -L/4 and L/4, and works out the
+# probability of 0<x<L/8 (needed below) at the same time
+obs=observables(lambda x: cos2pixoverL(A,x,L), -0.5, 0.5, breaks=[-L/4,L/4], regions=[(0,L/8)])
+print("Did we normalise the wavefunction?\nN=",obs["norm"])
 
 # ## Question 1b) Probability
 #
@@ -129,8 +133,7 @@ print("Did we normalise the wavefunction?\nN=",norm)
 #
 
 #Which again we can check
-x = np.linspace(0, 1./8., 100) # 0 to 1/8 in 100 steps
-prob=np.trapz(cos2pixoverL(A,x,L)**2,dx=x[1]-x[0])
+prob=obs["regions"][0] # The probability of 0<x<L/8 from the observables above
 print("What is the probability of finding the system in 0<x<L/8?\nP=",prob)
 print("1/4 + 1/(2pi)=",0.25 + 1./(2*math.pi))
 
@@ -195,9 +198,10 @@ ax.set_ylabel("$\psi(x)$") # Set the y-axis label
 ax.grid() # Draw a grid
 # -
 
-#Once more we can check by numerical integration using numpy.trapz
-norm=np.trapz(psiq2(A,x,mu,sig)**2,dx=x[1]-x[0])
-print("Did we normalise the wavefunction?\nN=",norm)
+#Once more we can check by numerical integration, this time out to 10 sigma where psi is negligible
+obs=observables(lambda x: psiq2(A,x,mu,sig), mu-10*sig, mu+10*sig, panels=4)
+print("Did we normalise the wavefunction?\nN=",obs["norm"])
+print("A Gaussian has the smallest possible uncertainty, Delta x Delta p = hbar/2:",obs["uncertainty"])
 
 
 # # Question 3
@@ -212,26 +216,8 @@ print("Did we normalise the wavefunction?\nN=",norm)
 # d) $ \psi(x) = N e^{a x}$
 #
 # e) $ \psi(x) = N e^{-a x}$
-
-# +
-#Define a function which will operate on an array of x values all at once
-def psiq3a(N,x,a):
-    return N *np.exp(a*x**2)
-
-def psiq3b(N,x,a):
-    return N *np.exp(-a*x**2)
-
-def psiq3c(N,x,a):
-    return N *np.exp(-a*x**2)/(3-x)
-
-def psiq3d(N,x,a):
-    return N *np.exp(a*x)
-
-def psiq3e(N,x,a):
-    return N *np.exp(-a*x)
-
-
-# -
+#
+# These are the functions psiq3a(N,x,a) to psiq3e(N,x,a), imported from wavefunctions.py at the top, which work on an array of $x$ values all at once.
 
 #Now let's plot probabilty density
 N=1
@@ -330,13 +316,8 @@ ax.grid() # Draw a grid
 # \frac{A(b-x)}{(b-a)} & \text{if } a \leq x \lt b \\ 
 # 0 & \text{otherwise}
 # \end{cases}$$
-
-#Define a function which will operate on an array of x values all at once
-def psiq4(A,x,a,b):
-    conds = [x < 0, (x>= 0) & (x<a), (x >= a) & (x <= b), x > b]   #The four regions of x
-    funcs = [lambda x:0, lambda x: A*x/a, lambda x: A*(b-x)/(b-a), 
-            lambda x: 0]  #the lambda keyword is allowing us to define a quick function
-    return np.piecewise(x, conds, funcs)  #Now do the piecewise calculation and return it
+#
+# This is the function psiq4(A,x,a,b), imported from wavefunctions.py at the top, which works on an array of $x$ values all at once. Its regions, from psiq4Regions(A,a,b), are used again below to do the integrals exactly.
 
 
 #Now let's plot the wavefunction
@@ -344,8 +325,8 @@ A=1
 a=1.5
 b=3
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
-x = np.linspace(-1,4,10000)
-ax.plot(x,psiq4(A,x,a,b),linewidth=3,label="a") #Plot x vs \psi(x)
+x, psi = adaptiveSample(lambda x: psiq4(A,x,a,b), -1, 4, breaks=[0,a,b]) #Extra points only at the corners
+ax.plot(x,psi,linewidth=3,label="a") #Plot x vs \psi(x)
 ax.set_title(r"$\psi_4(x), A="+str(A)+", a="+str(a)+", b="+str(b)+"$")  #Set the title
 ax.set_xlabel("$x$") # Set the x-axis label
 ax.set_ylabel("$\psi(x)$") # Set the y-axis label
@@ -372,8 +353,8 @@ a=1
 b=3
 A=np.sqrt(3/b)
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
-x = np.linspace(-1,4,10000)
-ax.plot(x,psiq4(A,x,a,b),linewidth=3,label="a") #Plot x vs \psi(x)
+x, psi = adaptiveSample(lambda x: psiq4(A,x,a,b), -1, 4, breaks=[0,a,b]) #Extra points only at the corners
+ax.plot(x,psi,linewidth=3,label="a") #Plot x vs \psi(x)
 ax.set_title(r"$\psi_4(x), A="+str(A)+", a="+str(a)+", b="+str(b)+"$")  #Set the title
 ax.set_xlabel("$x$") # Set the x-axis label
 ax.set_ylabel("$\psi(x)$") # Set the y-axis label
@@ -384,8 +365,8 @@ a=1
 b=3
 A=np.sqrt(3/b)
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
-x = np.linspace(-1,4,10000)
-ax.plot(x,psiq4(A,x,a,b)**2,linewidth=3,label="a") #Plot x vs \psi(x)
+x, psi = adaptiveSample(lambda x: psiq4(A,x,a,b), -1, 4, breaks=[0,a,b]) #Extra points only at the corners
+ax.plot(x,psi**2,linewidth=3,label="a") #Plot x vs \psi(x)
 ax.set_title(r"$\rho_4(x)=\psi^2_4(x), A="+str(A)+", a="+str(a)+", b="+str(b)+"$")  #Set the title
 ax.set_xlabel("$x$") # Set the x-axis label
 ax.set_ylabel("$\psi(x)$") # Set the y-axis label
@@ -421,10 +402,13 @@ def nastymess(a,b):
 
 
 # We can also evaulate this numerically
-#Once more we can check by numerical integration using numpy.trapz
-mu=np.trapz(x*psiq4(A,x,a,b)**2,dx=x[1]-x[0])
+#This time with adaptive Simpson's rule, which only needs a few points since it is told where the corners are
+mu, points=adaptiveIntegrate(lambda x: x*psiq4(A,x,a,b)**2, -1, 4, breaks=[0,a,b])
 print("What is the numerically integrated expectation value:\n<x>=",mu)
 print("What is the nasty mess value:\n<x>=",nastymess(a,b))
+#Or exactly, region by region, using the breakpoints from psiq4Regions (10 evaluations in each straight piece)
+norm, xMoment = regionMoments(*psiq4Regions(A,a,b), moments=(0,1), order=10)
+print("Region by region:\n<x>=",xMoment/norm)
 # -
 
 
@@ -0,0 +1,188 @@
+# Compiled kernels for finitePsi and psiq4, for quadrature and for big arrays
+#
+# scipy.integrate.quad calls its integrand once per point through the Python interpreter, and calling the
+# numpy versions (piecewiseEval, one searchsorted and a handful of array operations) on a single float costs
+# tens of microseconds a time. Here each wavefunction is also written as a plain scalar function with the
+# math module, one if per region. When numba is installed the scalar functions are compiled, array loops
+# are built on them, and quadFunction hands quad a scipy.LowLevelCallable so the whole integration runs
+# without going back into Python. Without numba everything still works: quad gets the plain scalar function
+# (already much cheaper per call than the numpy one) and the array kernels fall back to wavefunctions.py.
+#
+# fsolve has no LowLevelCallable interface (MINPACK always calls back into Python), so the root finding is
+# left as it is; findBoundStates and trackBoundStates don't need many calls anyway.
+#
+# python compiledKernels.py compares quad with the numpy integrand against quadFunction.
+
+import numpy as np  #import the numpy library as np
+import math  #Import math for the scalar functions
+
+try:
+    import numba  #Optional, everything below has a fallback without it
+except ImportError:
+    numba=None
+
+compiled=numba is not None
+
+
+# ### Scalar kernels, one value of x at a time
+
+#The finite well bound state with constants from finiteWell.boundStateConstants, regions as boundStateRegions
+def finitePsiScalar(x,D,F,k0,k1,L):
+    if x<0:
+        return D*math.exp(k0*x)
+    if x<=L:
+        return k0*D*math.sin(k1*x)/k1+D*math.cos(k1*x)
+    return F*math.exp(-k0*x)
+
+#psiq4 of bonusWavefunctions.py, regions as psiq4Regions
+def psiq4Scalar(x,A,a,b):
+    if x<0 or x>b:
+        return 0.0
+    if x<a:
+        return A*x/a
+    return A*(b-x)/(b-a)
+
+if compiled:
+    finitePsiScalar=numba.njit(cache=True)(finitePsiScalar)
+    psiq4Scalar=numba.njit(cache=True)(psiq4Scalar)
+
+def finiteRhoScalar(x,D,F,k0,k1,L):
+    return finitePsiScalar(x,D,F,k0,k1,L)**2
+
+def psiq4RhoScalar(x,A,a,b):
+    return psiq4Scalar(x,A,a,b)**2
+
+if compiled:
+    finiteRhoScalar=numba.njit(cache=True)(finiteRhoScalar)
+    psiq4RhoScalar=numba.njit(cache=True)(psiq4RhoScalar)
+
+
+#The constants each kernel takes after x, from the physical parameters
+def finiteConstants(D,E,U,L,m):
+    from finiteWell import boundStateConstants
+    return tuple(float(c) for c in boundStateConstants(D,E,U,L,m))+(float(L),)
+
+def psiq4Constants(A,a,b):
+    return (float(A),float(a),float(b))
+
+
+# ### Array kernels
+
+if compiled:
+    @numba.njit(cache=True)
+    def finitePsiLoop(x,D,F,k0,k1,L,out):
+        for i in range(x.size):
+            out[i]=finitePsiScalar(x[i],D,F,k0,k1,L)
+
+    @numba.njit(cache=True)
+    def psiq4Loop(x,A,a,b,out):
+        for i in range(x.size):
+            out[i]=psiq4Scalar(x[i],A,a,b)
+
+
+#Run loop over x (any shape) with the constants, into out if it is given
+def runLoop(loop,x,constants,out):
+    x=np.ascontiguousarray(x,dtype=float)
+    flat=np.empty(x.size)
+    loop(x.ravel(),*constants,flat)
+    if out is None:
+        return flat.reshape(x.shape)
+    out[...]=flat.reshape(x.shape)
+    return out
+
+#finitePsi and psiq4 with the same arguments as in wavefunctions.py, compiled loops if numba is there
+def finitePsiCompiled(x,D,E,U,L,m,out=None):
+    if not compiled:
+        from wavefunctions import finitePsi
+        return finitePsi(x,D,E,U,L,m,out=out)
+    return runLoop(finitePsiLoop,x,finiteConstants(D,E,U,L,m),out)
+
+def psiq4Compiled(A,x,a,b,out=None):
+    if not compiled:
+        from wavefunctions import psiq4
+        return psiq4(A,x,a,b,out=out)
+    return runLoop(psiq4Loop,x,psiq4Constants(A,a,b),out)
+
+
+# ### Quadrature
+
+quadKernels={"finitePsi":(finitePsiScalar,finiteConstants),"finiteRho":(finiteRhoScalar,finiteConstants),
+             "psiq4":(psiq4Scalar,psiq4Constants),"psiq4Rho":(psiq4RhoScalar,psiq4Constants)}
+
+#quad wrappers with the double f(int n, double *xx) signature, xx holding x and then the constants
+quadCallbacks={}
+if compiled:
+    quadSignature=numba.types.float64(numba.types.intc,numba.types.CPointer(numba.types.float64))
+
+    @numba.cfunc(quadSignature)
+    def finitePsiQuad(n,xx):
+        return finitePsiScalar(xx[0],xx[1],xx[2],xx[3],xx[4],xx[5])
+
+    @numba.cfunc(quadSignature)
+    def finiteRhoQuad(n,xx):
+        return finiteRhoScalar(xx[0],xx[1],xx[2],xx[3],xx[4],xx[5])
+
+    @numba.cfunc(quadSignature)
+    def psiq4Quad(n,xx):
+        return psiq4Scalar(xx[0],xx[1],xx[2],xx[3])
+
+    @numba.cfunc(quadSignature)
+    def psiq4RhoQuad(n,xx):
+        return psiq4RhoScalar(xx[0],xx[1],xx[2],xx[3])
+
+    quadCallbacks={"finitePsi":finitePsiQuad,"finiteRho":finiteRhoQuad,"psiq4":psiq4Quad,"psiq4Rho":psiq4RhoQuad}
+
+
+#The integrand and args for scipy.integrate.quad(f,lo,hi,args=args) of one of the quadKernels, e.g.
+#  f,args=quadFunction("finiteRho",None,E,U,L,m)
+#f is a LowLevelCallable when numba is installed and the plain scalar function otherwise
+def quadFunction(kernel,*params):
+    scalar,constants=quadKernels[kernel]
+    args=constants(*params)
+    if compiled:
+        from scipy import LowLevelCallable
+        return LowLevelCallable(quadCallbacks[kernel].ctypes),args
+    return scalar,args
+
+
+#Time quad over the finite well density and psiq4^2 with the numpy integrand and with quadFunction,
+#and the array kernels against wavefunctions.py
+def benchmarkKernels(points=10**6,repeats=5):
+    import time  #Only needed here
+    import scipy.constants
+    from scipy.integrate import quad
+    from finiteWell import findBoundStates, finiteNormD
+    from wavefunctions import finitePsi, psiq4
+
+    def best(f):
+        times=[]
+        for i in range(repeats):
+            start=time.perf_counter()
+            result=f()
+            times.append(time.perf_counter()-start)
+        return min(times),result
+
+    m=scipy.constants.electron_mass
+    U,L=25,0.5e-9
+    E=findBoundStates(U,L,m)[2]
+    D=finiteNormD(E,U,L,m)
+    A,a,b=math.sqrt(3/2),0.5,2
+    cases=[("finite well rho",lambda x: finitePsi(x,D,E,U,L,m)**2,("finiteRho",D,E,U,L,m),-10*L,11*L,[0,L]),
+           ("psiq4^2",lambda x: psiq4(A,x,a,b)**2,("psiq4Rho",A,a,b),-1,3,[0,a,b])]
+    print("numba is %s"%("installed" if compiled else "not installed, using the plain Python fallbacks"))
+    print("%-18s %12s %12s %8s %22s"%("quad","numpy (ms)","kernel (ms)","speedup","integrals"))
+    for name,numpyF,kernel,lo,hi,breaks in cases:
+        f,args=quadFunction(*kernel)
+        tNumpy,(iNumpy,err)=best(lambda: quad(numpyF,lo,hi,points=breaks,limit=200))
+        tKernel,(iKernel,err)=best(lambda: quad(f,lo,hi,args=args,points=breaks,limit=200))
+        print("%-18s %12.2f %12.2f %8.1f %10.8f %10.8f"%(name,1000*tNumpy,1000*tKernel,tNumpy/tKernel,iNumpy,iKernel))
+
+    x=np.linspace(-L,2*L,points)
+    tNumpy,psi=best(lambda: finitePsi(x,D,E,U,L,m))
+    tKernel,psiKernel=best(lambda: finitePsiCompiled(x,D,E,U,L,m))
+    print("finitePsi on %d points: numpy %.1f ms, kernel %.1f ms, largest difference %.1e"
+          %(points,1000*tNumpy,1000*tKernel,np.max(np.abs(psi-psiKernel))/np.max(np.abs(psi))))
+
+
+if __name__=="__main__":
+    benchmarkKernels()
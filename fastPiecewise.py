@@ -0,0 +1,74 @@
+# A faster replacement for np.piecewise for functions defined on regions of x
+#
+# np.piecewise builds one boolean mask per condition, allocates a zero-filled output, and copies x and the
+# result through every mask. On a sorted grid (e.g. anything from np.linspace) each region is a contiguous
+# slice, so we can find the slice edges with np.searchsorted and write each branch straight into the output.
+#
+# The regions are described by their breakpoints and which side owns each breakpoint, e.g. for
+#   x < 0,  0 <= x <= 2,  x > 2
+# we use breaks=[0,2] and sides=["left","right"]. The side names are the np.searchsorted ones:
+#   "left"  - the breakpoint belongs to the region on its right (x >= b)
+#   "right" - the breakpoint belongs to the region on its left (x <= b)
+# The breakpoints must be in increasing order. funcs has one entry per region (len(breaks)+1), and each
+# entry is either a constant or a function of x, exactly as for np.piecewise. An exponential branch can be
+# given as an ExpTail, which evaluates the same but lets integrators (observables.regionMoments) do its integral
+# exactly, e.g. the tails of the finite well states outside the well.
+
+import numpy as np  #import the numpy library as np
+
+
+#A region function amplitude*exp(rate*x) which knows what it is
+class ExpTail:
+    def __init__(self,amplitude,rate):
+        self.amplitude=amplitude
+        self.rate=rate
+
+    def __call__(self,x):
+        return self.amplitude*np.exp(self.rate*x)
+
+
+#Turn breaks and sides into the list of conditions np.piecewise would use
+def piecewiseConds(x,breaks,sides):
+    above=[(x>=b) if side=="left" else (x>b) for b,side in zip(breaks,sides)]  #Is x past each breakpoint?
+    below=[~a for a in above]
+    return [below[0]]+[above[i]&below[i+1] for i in range(len(breaks)-1)]+[above[-1]]
+
+
+#Find the index where each region starts and stops on a sorted 1D grid x.
+#Region i is x[edges[i]:edges[i+1]], and the edges can be reused for every function evaluated on the same grid
+def regionEdges(x,breaks,sides):
+    edges=[0]
+    for b,side in zip(breaks,sides):
+        edges.append(int(np.searchsorted(x,b,side=side)))
+    edges.append(len(x))
+    return edges
+
+
+#Is x a 1D grid in increasing order (so the regions are contiguous slices)?
+def isSortedGrid(x):
+    return x.ndim==1 and (x.size<2 or bool(np.all(x[1:]>=x[:-1])))
+
+
+#Evaluate the piecewise function described by breaks, sides and funcs at x.
+#  out   - optional preallocated output array (same shape as x) which is filled and returned
+#  edges - optional result of regionEdges(x,breaks,sides), to skip the search when x is reused
+#Unsorted or multi-dimensional x fall back to np.piecewise so the results are always the same
+def piecewiseEval(x,breaks,sides,funcs,out=None,edges=None):
+    x=np.asarray(x)
+    dtype=x.dtype if x.dtype.kind=="f" else np.float64  #Integer grids still give a floating point answer
+    if out is None:
+        out=np.empty(x.shape,dtype=dtype)
+    if edges is None and not isSortedGrid(x):
+        out[...]=np.piecewise(x.astype(dtype,copy=False),piecewiseConds(x,breaks,sides),funcs)
+        return out
+    if edges is None:
+        edges=regionEdges(x,breaks,sides)
+    for i,f in enumerate(funcs):
+        start,stop=edges[i],edges[i+1]
+        if stop<=start:  #Nothing in this region
+            continue
+        if callable(f):
+            out[start:stop]=f(x[start:stop])  #x[start:stop] is a view, no copy is made
+        else:
+            out[start:stop]=f  #Constant branches are just a fill
+    return out
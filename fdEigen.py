@@ -0,0 +1,135 @@
+# Finite difference eigenstates of any 1D potential
+#
+# On an evenly spaced grid x_0..x_{N-1} with psi=0 at both ends (hard walls just outside the region of
+# interest), the second derivative is (psi_{i+1} - 2 psi_i + psi_{i-1})/dx^2, so the Hamiltonian
+#   H = -hbar^2/(2m) d^2/dx^2 + V(x)
+# becomes a symmetric tridiagonal matrix with
+#   diagonal      hbar^2/(m dx^2) + V(x_i)
+#   off-diagonal  -hbar^2/(2m dx^2)
+# Only the two diagonals are ever stored, so 10^6 grid points is no problem. The lowest k states come either
+# from LAPACK's tridiagonal eigensolver (bisection plus inverse iteration for just the states asked for) or
+# from a shift-invert sparse eigensolver. By default the tridiagonal solver is used below shiftInvertPoints grid
+# points and shift-invert above: the tridiagonal eigenvectors pick up rounding error that grows like points^2
+# (2e-8 at 10^5 points, 4e-6 at 10^6), the shift-invert ones about a hundred times less.
+#
+# The diagonal is of order hbar^2/(m dx^2), so on fine grids the eigenvalues the solvers return lose accuracy
+# to rounding (relative errors in the ground state at 10^6 points of 2e-5 tridiagonal, 7e-8 shift-invert). The
+# energies are therefore worked out again from each state as <psi|H|psi>, with the kinetic part summed as
+# hbar^2/(2m) sum (psi_{i+1}-psi_i)^2/dx, which has no cancellation, so they are limited by the
+# discretisation rather than by rounding.
+#
+# Units: hbar=m=1 by default. For the finite well of finiteSquareWell.py use hbar=scipy.constants.hbar,
+# mass in kg, x in m, and energyUnit=scipy.constants.eV so that V and the energies are in eV.
+
+import numpy as np  #import the numpy library as np
+import math  #Import math so that math.pi can be used
+import scipy.linalg #Import scipy.linalg for the tridiagonal eigensolver
+import scipy.sparse #Import scipy.sparse for the sparse Hamiltonian
+import scipy.sparse.linalg #Import scipy.sparse.linalg for eigsh
+
+
+#The two diagonals of the Hamiltonian on the interior points x[1:-1] (psi=0 at x[0] and x[-1])
+def hamiltonianDiagonals(x,V,mass=1.0,hbar=1.0,energyUnit=1.0):
+    x=np.asarray(x,dtype=float)
+    dx=x[1]-x[0]
+    V=V(x) if callable(V) else np.broadcast_to(np.asarray(V,dtype=float),x.shape)
+    kineticScale=hbar**2/(2*mass*dx**2)/energyUnit
+    diagonal=2*kineticScale+V[1:-1]
+    offDiagonal=np.full(x.size-3,-kineticScale)
+    return diagonal,offDiagonal
+
+
+#The Hamiltonian as a scipy.sparse matrix on the interior points
+def hamiltonianSparse(x,V,mass=1.0,hbar=1.0,energyUnit=1.0):
+    diagonal,offDiagonal=hamiltonianDiagonals(x,V,mass,hbar,energyUnit)
+    return scipy.sparse.diags([offDiagonal,diagonal,offDiagonal],[-1,0,1],format="csc")
+
+
+#Above this many grid points fdEigenstates uses shift-invert unless it is told otherwise
+shiftInvertPoints=10**5
+
+#The energies <psi|H|psi> of states sampled on the whole grid x and normalised so that sum |psi|^2 dx = 1
+def stateEnergies(x,V,states,mass=1.0,hbar=1.0,energyUnit=1.0):
+    x=np.asarray(x,dtype=float)
+    dx=x[1]-x[0]
+    V=V(x) if callable(V) else np.broadcast_to(np.asarray(V,dtype=float),x.shape)
+    kinetic=hbar**2/(2*mass*dx)/energyUnit*np.sum(np.diff(states,axis=1)**2,axis=1)
+    return kinetic+dx*np.sum(V*states**2,axis=1)
+
+
+#The lowest k energies and eigenstates of the potential V on the evenly spaced grid x.
+#  method - "tridiagonal" (LAPACK stebz/stein), "shift-invert" (sparse eigsh around min(V)) or None to pick
+#           tridiagonal below shiftInvertPoints grid points and shift-invert above
+#Returns (energies, states) with states[i] the i-th state sampled on the whole grid (zero at the two ends),
+#normalised so that sum |psi|^2 dx = 1 and with the sign chosen so the state starts off positive like infinitePsi.
+#The energies are stateEnergies of the states rather than the solver's eigenvalues
+def fdEigenstates(x,V,k=5,mass=1.0,hbar=1.0,energyUnit=1.0,method=None):
+    x=np.asarray(x,dtype=float)
+    dx=x[1]-x[0]
+    if method is None:
+        method="tridiagonal" if x.size<=shiftInvertPoints else "shift-invert"
+    diagonal,offDiagonal=hamiltonianDiagonals(x,V,mass,hbar,energyUnit)
+    if method=="tridiagonal":
+        energies,vectors=scipy.linalg.eigh_tridiagonal(diagonal,offDiagonal,select="i",select_range=(0,k-1))
+    elif method=="shift-invert":
+        H=hamiltonianSparse(x,V,mass,hbar,energyUnit)
+        energies,vectors=scipy.sparse.linalg.eigsh(H,k=k,sigma=diagonal.min()-2*abs(offDiagonal[0]),which="LM")
+        order=np.argsort(energies)
+        energies,vectors=energies[order],vectors[:,order]
+    else:
+        raise ValueError("Unknown method "+str(method))
+
+    states=np.zeros((k,x.size))
+    states[:,1:-1]=vectors.T/np.sqrt(dx)  #Unit vectors become sum |psi|^2 dx = 1
+    for state in states:  #Flip each state so its first clearly non-zero value is positive
+        first=np.argmax(np.abs(state)>1e-3*np.abs(state).max())
+        if state[first]<0:
+            state*=-1
+    return stateEnergies(x,V,states,mass,hbar,energyUnit),states
+
+
+#Check the solver against the analytic answers: the infinite well (E_n=n^2 pi^2/2 and psi=sqrt(2) sin(n pi x)
+#for L=hbar=m=1, as in infinitePsi) and the finite well energies from finiteWell.findBoundStates.
+#Prints the largest relative energy error and the largest psi error of each case, and raises AssertionError
+#naming the cases that are outside the tolerances: energyTol for the infinite well energies, wellTol for the
+#finite well ones (the step in V makes them converge more slowly) and psiTol for the infinite well states.
+#The defaults are a few times the discretisation error on the default grid.
+#Returns the errors as {case: (energy error, psi error or None)}
+def validateFdEigen(points=20001,k=4,energyTol=1e-7,wellTol=1e-5,psiTol=1e-6):
+    from finiteWell import findBoundStates
+    import scipy.constants
+
+    errors={}
+    x=np.linspace(0,1,points)
+    n=np.arange(1,k+1)
+    for method in ("tridiagonal","shift-invert"):
+        energies,states=fdEigenstates(x,0.0,k,method=method)
+        exact=n**2*math.pi**2/2
+        psiError=max(np.max(np.abs(states[i]-np.sqrt(2)*np.sin(n[i]*math.pi*x))) for i in range(k))
+        errors["infinite well, "+method]=(np.max(np.abs(energies/exact-1)),psiError)
+
+    U,L,m=25,0.5e-9,scipy.constants.electron_mass
+    cells=(points-1)//13  #Grid steps per L, so x=0 and x=L are grid points
+    i=np.arange(-6*cells,7*cells+1)
+    x=L*i/cells  #The walls are far enough out that the tails have died away
+    V=np.where((i>0)&(i<cells),0.0,U)
+    V[(i==0)|(i==cells)]=U/2  #The average on the steps keeps the error second order in dx
+    exact=findBoundStates(U,L,m)
+    energies,states=fdEigenstates(x,V,len(exact),mass=m,hbar=scipy.constants.hbar,energyUnit=scipy.constants.eV)
+    errors["finite well"]=(np.max(np.abs(energies/exact-1)),None)  #No analytic psi to compare with
+
+    failures=[]
+    print("%-28s %14s %14s"%("case","energy error","psi error"))
+    for case,(energyError,psiError) in errors.items():
+        passed=energyError<(wellTol if psiError is None else energyTol) and (psiError is None or psiError<psiTol)
+        print("%-28s %14.2e %14s %s"%(case,energyError,"-" if psiError is None else "%.2e"%psiError,
+                                      "ok" if passed else "FAILED"))
+        if not passed:
+            failures.append(case)
+    if failures:
+        raise AssertionError("fdEigenstates is outside tolerance for "+", ".join(failures))
+    return errors
+
+
+if __name__=="__main__":
+    validateFdEigen()
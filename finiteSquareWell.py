@@ -24,7 +24,13 @@ import matplotlib as mpl #Some more style nonsense
 import math  #Import math so that math.pi can be used
 import scipy.constants #Import scipy.constants so that hbar and electron_mass can be used
 from scipy.optimize import fsolve # Import fsolve for the numerical solving
-from scipy import integrate # Import integrate for numerical integration
+from fastPiecewise import piecewiseEval #A faster version of np.piecewise
+from observables import regionMoments #Exact integrals region by region
+from stateCache import scriptCache #Import the on-disk cache of expensive results
+from wavefunctions import finitePsiRegions, finitePsi #The bound states, shared with the other scripts
+from finiteWell import findBoundStates, finiteNormD, trackBoundStates, boundStatePsi, cacheVersion # Import the automatic bound state finder and normalisation
+from transferMatrix import transmission, wellRegions # Import the transfer matrix transmission and reflection
+from adaptiveGrid import adaptiveSample # Import the adaptive grid for plotting
 
 
 #Set default figure size
@@ -47,11 +53,12 @@ mpl.rcParams['figure.dpi']=150 # dots per inch
 
 # +
 #Define a function which will operate on an array of x values all at once
-def finiteV(x):
-    conds = [x < 0, (x >= 0) & (x <= 1), x > 1]   #The three regions of x
-    funcs = [lambda x: 1000, lambda x: 0,  # #0 in the middle and 1000 outsides
-            lambda x: 1000]  #the lambda keyword is allowing us to define a quick function
-    return np.piecewise(x, conds, funcs)  #Now do the piecewise calculation and return it
+def finiteV(x,out=None):
+    breaks = [0, 1]   #The three regions of x are x<0, 0<=x<=1 and x>1
+    sides = ["left", "right"]  #Both x=0 and x=1 belong to the middle region
+    funcs = [1000, 0,  # #0 in the middle and 1000 outsides
+            1000]  #constant regions are just filled in
+    return piecewiseEval(x, breaks, sides, funcs, out=out)  #Now do the piecewise calculation and return it
     
     
 
@@ -200,16 +207,16 @@ def RHS(E,L,m):
 # +
 #Now let's LHS and RHS and see where they cross
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
-eInEv = np.linspace(0.5, 25, 10000)  # 1000 E values between 0.5eV and 25eV
 
-#Precompute the LHS and RHS to remove the poles
-lhs=LHS(eInEv,25) # LHS of the equation 
+#Precompute the LHS and RHS between 0.5eV and 25eV to remove the poles. Each gets its own adaptive grid, with
+#extra points only near the poles and where the curves bend (values beyond the y-axis limit of 10 don't matter)
+eLHS, lhs = adaptiveSample(lambda E: LHS(E,25), 0.5, 25, clip=10) # LHS of the equation 
 lhs[:-1][np.diff(lhs) > 0] = np.nan  #Insert a not a number when it changes from -ve to +ve
-rhs=RHS(eInEv,0.5e-9,scipy.constants.electron_mass) # RHS of the equation 
+eRHS, rhs = adaptiveSample(lambda E: RHS(E,0.5e-9,scipy.constants.electron_mass), 0.5, 25, clip=10) # RHS of the equation 
 rhs[:-1][np.diff(rhs) < 0] = np.nan #Insert a not a number when it changes from +ve to -ve
 
-ax.plot(eInEv,lhs,linewidth=3,label="LHS") # Plot the LHS
-ax.plot(eInEv,rhs,linewidth=3,label="RHS") # Plot the RHS
+ax.plot(eLHS,lhs,linewidth=3,label="LHS") # Plot the LHS
+ax.plot(eRHS,rhs,linewidth=3,label="RHS") # Plot the RHS
 ax.set_title(r"Finite Square Well (0.5nm, U=25eV, electron)") # Set the plot title
 ax.set_xlabel("$E (eV)$") # Set the x-axis label
 plt.legend() # Show the legend
@@ -237,6 +244,25 @@ print(EList)  # Print the 5 allowed energies of bound states
 
 # -
 
+#The guesses above only work for this particular well, findBoundStates brackets every root between the poles
+#of tan and refines it, so it finds all of the bound states for any U, L and m without needing guesses
+#The energies, the normalisations D and the states sampled on the plotting grid xPlot can be kept in an on-disk
+#cache keyed by U, L, m and the grid itself, so later runs just load them. Nothing is written to disk unless you
+#set cacheDir to a directory (or set the WAVEFUNCTION_CACHE environment variable)
+cacheDir=None
+xPlot=np.linspace(-0.5e-9, 1e-9, 1000) #1000 x-values from -0.5nm to 1nm, the grid of the wavefunction plots below
+def computeWellStates(U,L,m,x):
+    E=findBoundStates(U,L,m)
+    D=finiteNormD(E,U,L,m)  #Exact normalisation of every state at once
+    return {"E":E,"D":D,"psi":np.array([boundStatePsi(x,E[i],U,L,m,D=D[i]) for i in range(len(E))])}
+wellStatesVersion=(cacheVersion,1)  #finiteWell's version and this cell's, bump the 1 if computeWellStates changes
+cache=scriptCache(cacheDir)
+wellStates=cache.fetch("finiteWell",{"U":25,"L":0.5e-9,"m":scipy.constants.electron_mass,"x":xPlot},
+                       lambda: computeWellStates(25,0.5e-9,scipy.constants.electron_mass,xPlot),
+                       version=wellStatesVersion)
+EList=np.array(wellStates["E"])  # All the roots where LHS=RHS
+print(EList)  # Print the allowed energies of bound states
+
 # ## What about the wave functions?
 #
 # Having our numerical results for the energy we can plot our wavefunctions as a function of position $x$.
@@ -244,19 +270,11 @@ print(EList)  # Print the 5 allowed energies of bound states
 #
 
 # +
-#Define a function which will piecewise return the finite square well solutions
-def finitePsi(x,D,E,U,L,m):
-    k0=np.sqrt(2*m*(U-E)*scipy.constants.eV/(scipy.constants.hbar**2))  #k_0=sqrt(2m(U-E)/hbar^2)
-    k1=np.sqrt(2*m*E*scipy.constants.eV/(scipy.constants.hbar**2)) #k_1=sqrt(2mE/hbar^2)
-    F=((k0/k1)*D*np.sin(k1*L)+D*np.cos(k1*L))/np.exp(-k0*L) # F is a mess, see above
-    
-    conds = [x < 0, (x >= 0) & (x <= L), x > L]   #The three regions of x
-    funcs = [lambda x: D*np.exp(k0*x), #Wavefunction in region A
-             lambda x: (k0*D*np.sin(k1*x)/k1) + D*np.cos(k1*x),  #Wavefunction in region B
-            lambda x: F*np.exp(-k0*x)]  #Wavefunction in region C
-    return np.piecewise(x, conds, funcs)  #Now do the piecewise calculation and return it
-    
-    
+#finitePsi(x,D,E,U,L,m), imported from wavefunctions.py at the top, piecewise returns the finite square well
+#solutions from the formulae above: region A is D exp(k_0 x), region B is (k_0 D/k_1) sin(k_1 x) + D cos(k_1 x)
+#and region C is F exp(-k_0 x) with F from continuity at x=L. If D is None the normalised wavefunction is
+#returned, using the exact integral from finiteNormD. The tails are ExpTails, so their integrals are done exactly
+
 #The PDF is just the square of the waveform
 def finitePDF(x,D,E,U,L,m):
     return finitePsi(x,D,E,U,L,m)**2
@@ -266,14 +284,10 @@ def finitePDF(x,D,E,U,L,m):
 # +
 #Now let's plot our first 4 probability density functions
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
-x = np.linspace(-0.5e-9, 1e-9, 1000) #1000 x-values from -0.5nm to 1nm
+x = xPlot #The states were sampled on this grid when they were cached
 
-
-scaleList=[]
 for i in range(4):
-    tot,err=integrate.quad(finitePDF,-1e-9,1.5e-9,args=(1.,EList[i],25,0.5e-9,scipy.constants.electron_mass))
-    scaleList.append(np.sqrt(tot))
-    ax.plot(x,finitePsi(x,1./scaleList[i],EList[i],25,0.5e-9,scipy.constants.electron_mass),linewidth=2,label="n="+str(i+1))
+    ax.plot(x,wellStates["psi"][i],linewidth=2,label="n="+str(i+1))  #The cached finitePsi(x,None,EList[i],...)
     ax.axvline(x=0,linestyle=":",color="black")
     ax.axvline(x=0.5e-9,linestyle=":",color="black")
     ax.set_ylim(-62000,62000)
@@ -283,14 +297,18 @@ ax.set_xlabel("$x / L$")
 ax.set_ylabel("$\psi(x)$")
 plt.legend()
 
+#Check the normalisation region by region: Gauss-Legendre inside the well and exact integrals for the two tails
+for i in range(4):
+    print("n="+str(i+1)+" norm:",regionMoments(*finitePsiRegions(None,EList[i],25,0.5e-9,scipy.constants.electron_mass),moments=(0,))[0])
+
 
 # +
 #Now let's plot our first 4 probability density functions
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
-x = np.linspace(-0.5e-9, 1.0e-9, 1000)
+x = xPlot
 
 for i in range(4):
-    ax.plot(x,finitePDF(x,1./scaleList[i],EList[i],25,0.5e-9,scipy.constants.electron_mass),linewidth=1,label="n="+str(i))
+    ax.plot(x,wellStates["psi"][i]**2,linewidth=1,label="n="+str(i))  #finitePDF from the cached samples
 
 
 ax.set_title(r"Finite Square Well")
@@ -344,18 +362,19 @@ plt.legend()
 # $$ \phi_C=\arctan\left[\frac{k_2}{k_1} \tan(k_1 L)\right] -  k_2 L$$
 
 #Define a function which will piecewise return the finite square well solutions
-def finitePsiUnbound(x,E,U,L,m):
+def finitePsiUnbound(x,E,U,L,m,out=None):
     k2=np.sqrt(2*m*(E-U)*scipy.constants.eV/(scipy.constants.hbar**2))
     k1=np.sqrt(2*m*E*scipy.constants.eV/(scipy.constants.hbar**2))
     B=k2/k1
     C=np.sqrt((k2*np.sin(k1*L)/k1)**2 + np.cos(k1*L)**2)
     phiC=np.arctan(k2*np.tan(k1*L)/k1)-k2*L 
     
-    conds = [x < 0, (x >= 0) & (x <= L), x > L]   #The three regions of x
+    breaks = [0, L]   #The three regions of x are x<0, 0<=x<=L and x>L
+    sides = ["left", "right"]  #Both x=0 and x=L belong to region B
     funcs = [lambda x: np.sin(k2*x), 
              lambda x: B*np.sin(k1*x),  
             lambda x: C*np.sin(k2*x+phiC)]  #the lambda keyword is allowing us to define a quick function
-    return np.piecewise(x, conds, funcs)  #Now do the piecewise calculation and return it
+    return piecewiseEval(x, breaks, sides, funcs, out=out)  #Now do the piecewise calculation and return it
 
 
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
@@ -375,5 +394,34 @@ plt.legend()
 # The above plot illustrates one of the features of the finite square well. As you change the energy (always keeping in mind $E>U=25$eV) you see the amplitude of the wave in the right region is sometimes smaller than the amplitude on the left. This is particularly noticeable as $E-U \rightarrow 0$ 
 #
 # This is because some of the incoming particles on the left reflect off the potential well (but to model this properly we need to use complex numbers). This effect is similar to quantum tunnelling.
+#
+# With complex waves the transfer matrix method (transferMatrix.py) gives the fraction of particles that get through (T) and the fraction that bounce back (R) at a million energies in one go.
 
+# +
+fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
+eInEv = np.linspace(25.01, 200, 1000000)  #A million energies above the top of the well
+T, R = transmission(eInEv, *wellRegions(25, 0.5e-9), scipy.constants.electron_mass)
+ax.plot(eInEv, T, label="T")  #Transmission coefficient
+ax.plot(eInEv, R, label="R")  #Reflection coefficient
+ax.set_title(r"Finite Square Well")
+ax.set_xlabel("$E$ (eV)")
+ax.set_ylabel("Probability")
+plt.legend()
+# -
+
+# ### How do the energies change with the depth of the well?
+#
+# As $U$ increases every energy rises smoothly and new states appear one at a time at the top of the well ($E=U$). trackBoundStates follows each state from one well to the next, so each line below is one value of $n$.
 
+# +
+fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
+UList = np.linspace(0.5, 100, 2000)  #2000 well depths from 0.5eV to 100eV
+ETrack, dEdU, steps = trackBoundStates(UList, 0.5e-9, scipy.constants.electron_mass)
+for i in range(ETrack.shape[1]):
+    ax.plot(UList, ETrack[:,i], linewidth=1, label="n="+str(i+1))  #Column i is the state n=i+1
+ax.plot(UList, UList, linestyle=":", color="black")  #E=U, the top of the well
+ax.set_title(r"Finite Square Well (0.5nm, electron)")
+ax.set_xlabel("$U$ (eV)")
+ax.set_ylabel("$E$ (eV)")
+plt.legend()
+# -
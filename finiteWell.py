@@ -0,0 +1,219 @@
+# Numerical tools for the finite square well of finiteSquareWell.py
+#
+# Units follow the notebook: energies (E and U) in eV, well width L in m and particle mass m in kg.
+# The well occupies 0 <= x <= L with V=U outside.
+
+import numpy as np  #import the numpy library as np
+import math  #Import math so that math.pi can be used
+import scipy.constants #Import scipy.constants so that hbar and eV can be used
+
+from fastPiecewise import ExpTail, piecewiseEval  #Piecewise evaluation, with exactly integrable tails
+
+
+#Part of the stateCache keys of results computed here, bump it whenever a change to this module changes the
+#energies, normalisations or states it gives
+cacheVersion=1
+
+
+#The dimensionless well strength w_U = k_U L where k_U=sqrt(2mU/hbar^2)
+#Every bound state has k_1 L between 0 and w_U
+def wellStrength(U,L,m):
+    return np.sqrt(2*m*U*scipy.constants.eV)*L/scipy.constants.hbar
+
+#Convert from w=k_1 L back to an energy in eV
+def energyFromW(w,L,m):
+    return (w*scipy.constants.hbar/L)**2/(2*m*scipy.constants.eV)
+
+#The number of bound states is the number of half-periods of tan(k_1 L/2) that fit below w_U
+def numBoundStates(U,L,m):
+    return int(math.ceil(wellStrength(U,L,m)/math.pi))
+
+
+# The LHS=RHS condition 2 k_0 k_1 = (k_1^2 - k_0^2) tan(k_1 L) factorises into an even and an odd family
+#   k_0 = k_1 tan(k_1 L/2)      (states n=1,3,5,...)
+#   k_0 = -k_1 cot(k_1 L/2)     (states n=2,4,6,...)
+# Multiplying through by cos or sin removes the poles, and with w=k_1 L, q=k_0 L both become
+#   f_n(w) = w sin(w/2 + delta) - q cos(w/2 + delta)      with delta=0 (n odd) or pi/2 (n even)
+# The n-th state sits between the poles of tan/cot at w=(n-1)pi and w=n pi, where f_n changes sign exactly once.
+def boundStateCondition(w,wU,n):
+    delta=0.5*math.pi*((n+1)%2)  #Phase shift which turns the even condition into the odd one
+    q=np.sqrt(np.maximum(wU**2-w**2,0))  #k_0 L, clipped so rounding at w=wU can't give a nan
+    return w*np.sin(0.5*w+delta)-q*np.cos(0.5*w+delta)
+
+#Return the bracket (wLow,wHigh) of w=k_1 L which contains the n-th bound state
+def boundStateBracket(n,wU):
+    return (n-1)*math.pi, min(n*math.pi,wU)
+
+
+#Find every bound state energy (in eV) of the finite well in one call, no initial guesses needed
+#Each root is bracketed between neighbouring poles and then refined with Brent's method, which always converges
+def findBoundStates(U,L,m,xtol=1e-14):
+    from scipy.optimize import brentq  #Imported here as scipy.optimize is slow to import and only needed here
+    wU=wellStrength(U,L,m)
+    EList=np.zeros(numBoundStates(U,L,m)) # Make an empty array to fill with the energies of allowed states
+    for i in range(len(EList)):  # Loop over the brackets, state n=i+1
+        wLow,wHigh=boundStateBracket(i+1,wU)
+        if boundStateCondition(wHigh,wU,i+1)==0:  #Root sitting exactly on the threshold E=U
+            w=wHigh
+        else:
+            w=brentq(boundStateCondition,wLow,wHigh,args=(wU,i+1),xtol=xtol*max(wU,1),rtol=4*np.finfo(float).eps)
+        EList[i]=energyFromW(w,L,m)
+    return EList
+
+
+# For the batch solver it is nicer to write the same condition as a phase. Since arctan(q/w)=arccos(w/w_U),
+# both families become w = (n-1) pi + 2 arccos(w/w_U), and with w = w_U cos(theta) this is
+#   h_n(theta) = w_U cos(theta) - (n-1) pi - 2 theta = 0      for 0 <= theta <= pi/2
+# h_n is smooth, concave and has slope below -2 everywhere, so Newton's method converges in a few steps
+def boundStatePhase(theta,wU,n):
+    return wU*np.cos(theta)-(n-1)*math.pi-2*theta
+
+def boundStatePhaseDeriv(theta,wU):
+    return -wU*np.sin(theta)-2
+
+
+#Solve many wells at once. U, L and m can be arrays (they are broadcast together) and the result is
+#  EArray   - the bound state energies in eV, shape U.shape+(nMax,), padded with fill past the last state
+#  nStates  - the number of bound states in each well, shape U.shape
+#The condition only depends on w_U and n, so every (well, state) pair is refined together with
+#safeguarded Newton steps that fall back to bisection whenever a step would leave its bracket
+def findBoundStatesBatch(U,L,m,fill=np.nan,tol=1e-14,maxIter=100):
+    U,L,m=np.broadcast_arrays(np.asarray(U,dtype=float),np.asarray(L,dtype=float),np.asarray(m,dtype=float))
+    wU=wellStrength(U,L,m).ravel()
+    nStates=np.ceil(wU/math.pi).astype(int)  #Same count as numBoundStates, for every well at once
+    nMax=nStates.max() if nStates.size else 0
+    EArray=np.full((wU.size,nMax),fill,dtype=float)
+
+    well,state=np.nonzero(np.arange(1,nMax+1)[None,:]<=nStates[:,None])  #Every valid (well, state) pair
+    n=state+1
+    wUv=wU[well]
+    #The brackets of boundStateBracket turned into phases, hi*pi/wU can reach 1 so clip it for arccos
+    lo=np.arccos(np.minimum(n*math.pi/wUv,1))
+    hi=np.arccos((n-1)*math.pi/wUv)
+    theta=0.5*(lo+hi)
+    active=np.arange(theta.size)  #Pairs which have not converged yet
+    for it in range(maxIter):
+        if active.size==0:
+            break
+        ta,wUa,na=theta[active],wUv[active],n[active]
+        h=boundStatePhase(ta,wUa,na)
+        #h_n decreases with theta, so h>0 means the root lies above theta
+        lo[active]=np.where(h>0,ta,lo[active])
+        hi[active]=np.where(h>0,hi[active],ta)
+        #Newton step, replaced by bisection if it leaves the bracket
+        tNew=ta-h/boundStatePhaseDeriv(ta,wUa)
+        bad=~((tNew>=lo[active])&(tNew<=hi[active]))
+        tNew[bad]=0.5*(lo[active]+hi[active])[bad]
+        theta[active]=tNew
+        active=active[np.abs(tNew-ta)>tol]
+
+    EArray[well,state]=energyFromW(wUv*np.cos(theta),L.ravel()[well],m.ravel()[well])
+    return EArray.reshape(U.shape+(nMax,)),nStates.reshape(U.shape)
+
+
+
+# Following the states as the well changes. Along a path of wells (U_i, L_i) every state moves smoothly, so
+# instead of solving each well from scratch we start from the roots of the previous well. Writing E = U cos^2(theta)
+# (which is E=energyFromW(w_U cos(theta))), differentiating h_n(theta)=0 gives
+#   dtheta/dw_U = cos(theta)/(w_U sin(theta) + 2)
+# so the predictor is theta + dtheta/dw_U * (change in w_U), which is dE/dU (and dE/dL) in disguise, and a couple
+# of safeguarded Newton steps correct it. State n first appears at threshold (E=U, theta=0) once w_U passes
+# (n-1) pi. Just past that point h_n(theta) ~ (w_U-(n-1)pi) - 2 theta - w_U theta^2/2, whose root seeds the new
+# branch. Each state keeps its own column, so the branches are labelled by n however the path wanders.
+
+#The slope dtheta/dw_U of the phase of a bound state
+def boundStatePhaseSlope(theta,wU):
+    return np.cos(theta)/(wU*np.sin(theta)+2)
+
+#Track every bound state along a path of wells. U and L are 1D arrays (or one of them a number) giving the
+#wells in order, m the particle mass. Returns
+#  E          - energies in eV, shape (len(path), nMax), column n-1 is state n and nan where it isn't bound
+#  dEdU       - dE/dU at fixed L for every entry of E
+#  iterations - the number of Newton steps used at each point of the path
+def trackBoundStates(U,L,m,tol=1e-14,maxIter=50):
+    U,L=np.broadcast_arrays(np.atleast_1d(np.asarray(U,dtype=float)),np.atleast_1d(np.asarray(L,dtype=float)))
+    wU=wellStrength(U,L,m)
+    nMax=int(math.ceil(wU.max()/math.pi)) if wU.size else 0
+    n=np.arange(1,nMax+1)
+    E=np.full((wU.size,nMax),np.nan)
+    dEdU=np.full((wU.size,nMax),np.nan)
+    iterations=np.zeros(wU.size,dtype=int)
+    theta=np.full(nMax,np.nan)  #The phase of every state at the previous point
+    previous=None
+    for i,w in enumerate(wU):
+        bound=(n-1)*math.pi<w
+        known=bound&~np.isnan(theta)
+        if previous is not None:  #Predictor
+            theta[known]+=boundStatePhaseSlope(theta[known],previous)*(w-previous)
+        new=bound&np.isnan(theta)  #States appearing at threshold (or every state at the first point)
+        delta=w-(n[new]-1)*math.pi
+        theta[new]=(np.sqrt(4+2*w*delta)-2)/w
+        theta[~bound]=np.nan
+
+        #Safeguarded Newton corrector, as in findBoundStatesBatch
+        lo=np.arccos(np.minimum(n*math.pi/w,1))
+        hi=np.arccos(np.minimum((n-1)*math.pi/w,1))
+        active=np.flatnonzero(bound)
+        theta[active]=np.clip(theta[active],lo[active],hi[active])
+        for it in range(maxIter):
+            if active.size==0:
+                break
+            ta=theta[active]
+            h=boundStatePhase(ta,w,n[active])
+            lo[active]=np.where(h>0,ta,lo[active])
+            hi[active]=np.where(h>0,hi[active],ta)
+            tNew=ta-h/boundStatePhaseDeriv(ta,w)
+            bad=~((tNew>=lo[active])&(tNew<=hi[active]))
+            tNew[bad]=0.5*(lo[active]+hi[active])[bad]
+            theta[active]=tNew
+            iterations[i]+=1
+            active=active[np.abs(tNew-ta)>tol]
+
+        cos=np.cos(theta[bound])
+        E[i,bound]=U[i]*cos**2
+        #d/dU of U cos^2(theta) with dw_U/dU = w_U/(2U)
+        dEdU[i,bound]=cos**2-U[i]*np.sin(2*theta[bound])*boundStatePhaseSlope(theta[bound],w)*w/(2*U[i])
+        previous=w
+    return E,dEdU,iterations
+
+#The value of D which normalises finitePsi, from the exact integral of |psi|^2 over the three regions
+#  Region A:  int_{-inf}^0 D^2 exp(2 k_0 x) dx = D^2/(2 k_0)
+#  Region B:  int_0^L D^2 (a sin(k_1 x) + cos(k_1 x))^2 dx with a=k_0/k_1
+#             = D^2 [ (1+a^2) L/2 + (1-a^2) sin(2 k_1 L)/(4 k_1) + a sin^2(k_1 L)/k_1 ]
+#  Region C:  int_L^inf F^2 exp(-2 k_0 x) dx = psi_B(L)^2/(2 k_0)
+#Works on arrays of E (all the states of a well at once), no integration window is needed
+def finiteNormD(E,U,L,m):
+    k0=np.sqrt(2*m*(U-E)*scipy.constants.eV/(scipy.constants.hbar**2))  #k_0=sqrt(2m(U-E)/hbar^2)
+    k1=np.sqrt(2*m*E*scipy.constants.eV/(scipy.constants.hbar**2)) #k_1=sqrt(2mE/hbar^2)
+    a=k0/k1
+    sinL=np.sin(k1*L)
+    cosL=np.cos(k1*L)
+    regionA=1/(2*k0)
+    regionB=(1+a**2)*L/2+(1-a**2)*2*sinL*cosL/(4*k1)+a*sinL**2/k1
+    regionC=(a*sinL+cosL)**2/(2*k0)
+    return 1/np.sqrt(regionA+regionB+regionC)
+
+
+#The constants (D, F, k_0, k_1) of the bound state with energy E, D=None gives the normalised state
+def boundStateConstants(D,E,U,L,m):
+    if D is None:
+        D=finiteNormD(E,U,L,m)  #D which makes the integral of |psi|^2 over all x equal to 1
+    k0=np.sqrt(2*m*(U-E)*scipy.constants.eV/(scipy.constants.hbar**2))  #k_0=sqrt(2m(U-E)/hbar^2)
+    k1=np.sqrt(2*m*E*scipy.constants.eV/(scipy.constants.hbar**2)) #k_1=sqrt(2mE/hbar^2)
+    F=((k0/k1)*D*np.sin(k1*L)+D*np.cos(k1*L))/np.exp(-k0*L) #Continuity of psi at x=L
+    return D,F,k0,k1
+
+#The breaks, sides and funcs of the bound state with energy E (the arguments of piecewiseEval), as derived in
+#finiteSquareWell.py. D=None gives the normalised state. The tails outside the well are ExpTails
+def boundStateRegions(D,E,U,L,m):
+    D,F,k0,k1=(float(c) for c in boundStateConstants(D,E,U,L,m))  #Python floats keep a float32 x in float32
+    breaks=[0,L]  #The three regions of x are x<0, 0<=x<=L and x>L
+    sides=["left","right"]  #Both x=0 and x=L belong to region B
+    funcs=[ExpTail(D,k0),  #Region A, D*exp(k0*x)
+           lambda x: (k0*D*np.sin(k1*x)/k1)+D*np.cos(k1*x),  #Region B
+           ExpTail(F,-k0)]  #Region C, F*exp(-k0*x)
+    return breaks,sides,funcs
+
+#The bound state with energy E at x, normalised if D is None
+def boundStatePsi(x,E,U,L,m,D=None,out=None):
+    return piecewiseEval(x,*boundStateRegions(D,E,U,L,m),out=out)
@@ -0,0 +1,325 @@
+# Numerical tools for the hydrogen wavefunctions of hydrogenWavefunction.py
+#
+# Distances are in units of the Bohr radius a_0, as in the notebook.
+
+import numpy as np  #import the numpy library as np
+import math  #Import math for the factorials and binomial coefficients
+import functools  #Import functools for the lru_cache
+import bisect  #Import bisect to find where rows finish in the Laguerre recurrence
+
+
+#The tables below only depend on (n,l) so they are cached, this is how many (n,l) pairs are kept
+tableCacheSize=1024
+
+
+#Build the coefficients of the associated Laguerre polynomial L^{2l+1}_{n-l-1} and the normalisation
+#  sqrt( (2/n)^3 (n-l-1)! / (2n (n+l)!) )
+#of R_nl, once per (n,l). Using the explicit sum
+#  L^alpha_k(x) = sum_{i=0}^{k} (-1)^i binom(k+alpha, k-i) x^i / i!
+#the coefficients are returned highest power first (the order Horner's method wants) in a read-only array
+@functools.lru_cache(maxsize=tableCacheSize)
+def radialTable(n,l):
+    k=n-l-1  #Degree of the polynomial
+    alpha=2*l+1
+    coeffs=np.array([(-1)**i*math.comb(k+alpha,k-i)/math.factorial(i) for i in range(k,-1,-1)],dtype=float)
+    coeffs.flags.writeable=False  #The cached array is shared between callers
+    norm=math.sqrt((2.0/n)**3*math.factorial(n-l-1)/(2*n*math.factorial(n+l)))
+    return norm,coeffs
+
+
+#Evaluate a polynomial with coefficients (highest power first) at x using Horner's method,
+#working in place on a single output array of the given dtype
+def hornerEval(coeffs,x,dtype=float):
+    x=np.asarray(x,dtype=dtype)
+    y=np.full(x.shape,coeffs[0],dtype=dtype)
+    for c in coeffs[1:]:
+        y*=x
+        y+=c
+    return y
+
+
+# ## Large n
+# For n beyond about 30 the factorials in the normalisation overflow and the monomial coefficients of the
+# Laguerre polynomial cancel catastrophically, so the direct formula above falls apart. Instead we work
+# with log|R_nl| and evaluate the polynomial with the three-term recurrence
+#   (j+1) L^alpha_{j+1}(x) = (2j+1+alpha-x) L^alpha_j(x) - (j+alpha) L^alpha_{j-1}(x)
+# rescaling as we go so nothing overflows. This stays accurate up to n of several hundred.
+
+#Rescale the recurrence whenever a value gets bigger than this, checking every few steps
+#(one step can grow the values by at most about x/j so there is plenty of headroom before 1e308)
+recurrenceRescale=1e100
+recurrenceCheckEvery=4
+
+
+#log of sqrt((2/n)^3 (n-l-1)!/(2n (n+l)!)), using lgamma so the factorials never overflow
+def logRadialNorm(n,l):
+    return 1.5*math.log(2.0/n)+0.5*(math.lgamma(n-l)-math.log(2*n)-math.lgamma(n+l+1))
+
+
+#Evaluate L^alpha_k(x) for several degrees k at once with the three-term recurrence. Row i of X is evaluated
+#to degree kList[i] (the rows can have different arguments). The result is returned as (values,logScale) with
+#L^alpha_k(x) = values*exp(logScale), so that huge polynomials can be combined with exp(-x/2) safely.
+#One sweep up to the largest degree serves every row, each row is just copied out when it reaches its degree
+def laguerreRecurrenceRows(kList,alpha,X):
+    kList=np.asarray(kList,dtype=int)
+    order=np.argsort(kList,kind="stable")  #Work on the rows in order of degree so the active ones are a slice
+    kSorted=kList[order].tolist()
+    X=np.asarray(X,dtype=float)[order]
+    values=np.ones(X.shape)  #L_0=1, rows with k=0 are already done
+    logScale=np.zeros(X.shape)
+    prev=np.ones(X.shape)
+    curr=1.0+alpha-X  #L_1=1+alpha-x
+    nxt=np.empty(X.shape)
+    first=bisect.bisect_left(kSorted,1)  #Rows before this one have finished
+    for j in range(1,kSorted[-1] if kSorted else 0):
+        if kSorted[first]==j:  #Some rows have just reached their degree so they are finished
+            done=bisect.bisect_left(kSorted,j+1)
+            values[first:done]=curr[first:done]
+            first=done
+        a,b,c,xa=prev[first:],curr[first:],nxt[first:],X[first:]
+        #nxt=((2j+1+alpha-x)*curr-(j+alpha)*prev)/(j+1) without any temporary arrays
+        np.subtract(2*j+1+alpha,xa,out=c)
+        c*=b
+        a*=j+alpha
+        c-=a
+        c/=j+1
+        prev,curr,nxt=curr,nxt,prev
+        if j%recurrenceCheckEvery==0:
+            big=np.abs(curr[first:])>recurrenceRescale
+            if big.any():  #Divide both terms by the same factor, the recurrence is linear so this is safe
+                scale=np.abs(curr[first:][big])
+                curr[first:][big]/=scale
+                prev[first:][big]/=scale
+                logScale[first:][big]+=np.log(scale)
+    values[first:]=curr[first:]
+    unsorted=np.empty_like(order)
+    unsorted[order]=np.arange(order.size)  #Put the rows back in the order they were given
+    return values[unsorted],logScale[unsorted]
+
+
+#Evaluate L^alpha_k(x) with the three-term recurrence, as (value,logScale) like laguerreRecurrenceRows
+def laguerreRecurrence(k,alpha,x):
+    x=np.asarray(x,dtype=float)
+    values,logScale=laguerreRecurrenceRows([k],alpha,x[None])
+    return values[0],logScale[0]
+
+
+#l log(rho), with 0 log(0)=0 so that l=0 states are finite at the origin (scipy.special.xlogy without the import)
+def xlogy(l,rho):
+    if l==0:
+        return np.zeros(np.shape(rho))
+    return l*np.log(rho)
+
+
+#The normalised radial wavefunction computed in log space,
+#  log|R_nl| = log(norm) - rho/2 + l log(rho) + log|L^{2l+1}_{n-l-1}(rho)|  with rho=2r/n
+def radialPsiStable(r,n,l):
+    rho=2.*np.asarray(r,dtype=float)/n
+    lag,logScale=laguerreRecurrence(n-l-1,2*l+1,rho)
+    with np.errstate(divide="ignore"):  #log(0) at the nodes gives exp(-inf)=0 which is what we want
+        logPsi=logRadialNorm(n,l)-0.5*rho+xlogy(l,rho)+logScale+np.log(np.abs(lag))
+    return np.sign(lag)*np.exp(logPsi)
+
+
+#The direct formula with the cached tables, as used by radialHydrogenPsi for small n.
+#With dtype=np.float32 every array (and so the memory traffic) is half the size
+def radialPsiDirect(r,n,l,dtype=float):
+    r=np.asarray(r,dtype=dtype)
+    norm,coeffs=radialTable(n,l)
+    rho=2.*r/n
+    return norm*np.exp(-r/n)*rho**l*hornerEval(coeffs,rho,dtype)
+
+
+#Pick the direct formula for small n and the log-space recurrence otherwise.
+#In float32 the cancellation in the Laguerre sum grows quickly with n (4e-3 of the peak by n=15), so only
+#n<=directMaxN32 (errors below 1e-6 of the peak) is done in float32, bigger n are done in float64 and rounded
+directMaxN=15
+directMaxN32=6
+def radialPsi(r,n,l,dtype=float):
+    dtype=np.dtype(dtype)
+    if dtype==np.float64 or n>directMaxN32:
+        psi=radialPsiDirect(r,n,l) if n<=directMaxN else radialPsiStable(r,n,l)
+        return psi.astype(dtype,copy=False)
+    return radialPsiDirect(r,n,l,dtype)
+
+
+# ## Many orbitals at once
+
+#The first count hydrogen orbitals (n,l,m) in the order n=1,2,...; l=0..n-1; m=-l..l
+def orbitalStates(count):
+    states=[]
+    n=1
+    while len(states)<count:
+        for l in range(n):
+            for m in range(-l,l+1):
+                states.append((n,l,m))
+        n+=1
+    return states[:count]
+
+
+#The radial wavefunctions R_nl(r) of many states on the same grid r, as an array of shape (len(states),)+r.shape.
+#states is a list of (n,l) or (n,l,m) tuples (m is ignored, so states differing only in m share one evaluation).
+#The work is shared between the states:
+#  - exp(-r/n) is computed once per n and the powers (2r/n)^l are built up by multiplication over l
+#  - all the states with the same l share the Laguerre parameter 2l+1, so one laguerreRecurrenceRows sweep
+#    up to the largest degree gives every one of them
+def radialPsiStack(r,states):
+    r=np.asarray(r,dtype=float)
+    shape=r.shape
+    r=r.ravel()  #Work on a flat copy of the grid so every row of the stack is a proper array
+    nl=[(int(state[0]),int(state[1])) for state in states]
+    unique=sorted(set(nl),key=lambda s:(s[1],s[0]))  #Grouped by l, then by n
+    rowOf={s:i for i,s in enumerate(unique)}
+    stack=np.empty((len(unique),)+r.shape)
+
+    expTables={}  #exp(-r/n) for each n
+    powerTables={}  #(l,(2r/n)^l) for each n, the largest l done so far
+    for l in sorted(set(s[1] for s in unique)):
+        nList=[s[0] for s in unique if s[1]==l]
+        rho=2*r[None,:]/np.array(nList,dtype=float)[:,None]  #rho=2r/n for each n, one row each
+        lag,logScale=laguerreRecurrenceRows([n-l-1 for n in nList],2*l+1,rho)
+        for i,n in enumerate(nList):
+            row=stack[rowOf[(n,l)]]
+            if n>directMaxN or logScale[i].any():  #Big n, the pieces would overflow so combine them in log space
+                with np.errstate(divide="ignore"):
+                    row[...]=np.sign(lag[i])*np.exp(logRadialNorm(n,l)-0.5*rho[i]+xlogy(l,rho[i])
+                                                    +logScale[i]+np.log(np.abs(lag[i])))
+                continue
+            if n not in expTables:
+                expTables[n]=np.exp(-r/n)
+                powerTables[n]=(0,np.ones(r.shape))
+            lastL,power=powerTables[n]
+            for j in range(lastL,l):  #(2r/n)^l from the last power we made for this n
+                power=power*rho[i]
+            powerTables[n]=(l,power)
+            np.multiply(expTables[n],power,out=row)
+            row*=lag[i]
+            row*=math.exp(logRadialNorm(n,l))
+    return stack[[rowOf[s] for s in nl]].reshape((len(nl),)+shape)
+
+
+# ## Angular part
+# The spherical harmonics are Y_lm(theta,phi) = ybar_lm(cos theta) exp(i m phi), with ybar_lm the normalised
+# associated Legendre functions (Condon-Shortley phase included). Writing ybar_lm = u_m sin^m(theta) the
+# u_m are polynomials in cos(theta), and the recurrence in m at fixed l,
+#   u_{m-1} = -( sqrt((l+m+1)(l-m)) sin^2(theta) u_{m+1} + 2m cos(theta) u_m ) / sqrt((l+m)(l-m+1))
+# run downwards from the closed form u_l = (-1)^l sqrt((2l+1)/(4pi) prod_{k=1}^{l} (2k-1)/(2k)) gives every m
+# of the shell in one sweep, with no division by sin(theta) and so no trouble at the poles.
+# The negative m follow from Y_{l,-m} = (-1)^m conj(Y_lm), so |Y_{l,-m}|^2 = |Y_lm|^2.
+
+#u_l for the recurrence above, cached for each l
+@functools.lru_cache(maxsize=tableCacheSize)
+def sectoralStart(l):
+    prod=1.0
+    for k in range(1,l+1):
+        prod*=(2*k-1)/(2*k)
+    return (-1)**l*math.sqrt((2*l+1)/(4*math.pi)*prod)
+
+
+#The normalised associated Legendre functions ybar_lm(cos theta) for m=mMin..l of a single l, in one sweep.
+#Returns an array of shape (l+1,)+cosTheta.shape where row m holds ybar_lm (rows below mMin are left as zero)
+def legendreShell(l,cosTheta,mMin=0,dtype=float):
+    c=np.asarray(cosTheta,dtype=dtype)
+    s2=np.maximum(1-c**2,0)  #sin^2(theta)
+    u=np.zeros((l+1,)+c.shape,dtype=dtype)
+    u[l]=sectoralStart(l)
+    tmp=np.empty(c.shape,dtype=dtype)
+    for m in range(l,mMin,-1):  #Written with out= so the sweep makes no temporary arrays
+        scale=-1/math.sqrt((l+m)*(l-m+1))
+        np.multiply(c,u[m],out=u[m-1])
+        u[m-1]*=2*m*scale
+        if m<l:  #u_{l+1}=0
+            np.multiply(s2,u[m+1],out=tmp)
+            tmp*=math.sqrt((l+m+1)*(l-m))*scale
+            u[m-1]+=tmp
+    sinTheta=np.sqrt(s2)
+    sinPower=np.ones(c.shape,dtype=dtype)
+    for m in range(l+1):  #ybar_lm=u_m sin^m(theta)
+        if m>=mMin:
+            u[m]*=sinPower
+        sinPower*=sinTheta
+    return u
+
+
+#The complex spherical harmonics Y_lm(theta,phi) for the whole shell m=-l..l, as an array of shape
+#(2l+1,)+theta.shape with row m+l holding Y_lm. theta is the polar angle and phi the azimuthal one
+def sphericalHarmonicShell(l,theta,phi):
+    theta,phi=np.broadcast_arrays(np.asarray(theta,dtype=float),np.asarray(phi,dtype=float))
+    ybar=legendreShell(l,np.cos(theta))
+    Y=np.empty((2*l+1,)+theta.shape,dtype=complex)
+    Y[l]=ybar[0]
+    phase=np.exp(1j*phi)
+    phaseM=np.ones(theta.shape,dtype=complex)
+    for m in range(1,l+1):
+        phaseM*=phase  #exp(i m phi) built up by multiplication rather than a new exp for every m
+        Y[l+m]=ybar[m]*phaseM
+        Y[l-m]=(-1)**m*np.conj(Y[l+m])  #The -m harmonic comes for free
+    return Y
+
+
+#A single complex spherical harmonic Y_lm(theta,phi)
+def sphericalHarmonic(l,m,theta,phi):
+    theta,phi=np.broadcast_arrays(np.asarray(theta,dtype=float),np.asarray(phi,dtype=float))
+    Y=legendreShell(l,np.cos(theta),abs(m))[abs(m)]*np.exp(1j*abs(m)*phi)
+    return Y if m>=0 else (-1)**m*np.conj(Y)
+
+
+#|Y_lm|^2 for m=0..l as an array of shape (l+1,)+cosTheta.shape, the same values hold for -m
+def angularRhoShell(l,cosTheta):
+    return legendreShell(l,cosTheta)**2
+
+
+#The angular probability density |Y_lm(theta,phi)|^2, which does not depend on phi, as a function of
+#cos(theta) so that callers which already have z/r don't need an arccos. Only m=|m|..l of the sweep are needed
+def angularRhoCos(cosTheta,l,m,dtype=float):
+    return legendreShell(l,cosTheta,abs(m),dtype)[abs(m)]**2
+
+
+#Compare the accuracy and speed of the direct and the log-space paths.
+#The reference values come from mpmath at high precision if it is installed
+def benchmarkRadial(nList=(5,10,20,30,40,60,100,200,300,500),points=2000,repeats=20):
+    import time
+    try:
+        import mpmath
+    except ImportError:
+        mpmath=None
+
+    #R_nl(r) at 50 digits, laguerre is mpmath's generalised Laguerre function
+    def reference(rRef,n,l):
+        mpmath.mp.dps=50
+        out=[]
+        for ri in rRef:
+            rho=mpmath.mpf(2)*mpmath.mpf(ri)/n
+            norm=mpmath.sqrt((mpmath.mpf(2)/n)**3*mpmath.factorial(n-l-1)/(2*n*mpmath.factorial(n+l)))
+            out.append(float(norm*mpmath.exp(-rho/2)*rho**l*mpmath.laguerre(n-l-1,2*l+1,rho)))
+        return np.array(out)
+
+    print("%5s %5s %14s %14s %12s %12s"%("n","l","direct err","stable err","direct us","stable us"))
+    for n in nList:
+        l=n//3
+        r=np.linspace(0,2.5*n**2,points)  #Out past the classical turning point 2n^2
+        timings=[]
+        results=[]
+        for path in (radialPsiDirect,radialPsiStable):
+            try:
+                with np.errstate(all="ignore"):
+                    start=time.perf_counter()
+                    for i in range(repeats):
+                        psi=path(r,n,l)
+                    timings.append(1e6*(time.perf_counter()-start)/repeats)
+            except OverflowError:  #The direct normalisation can't even be computed
+                timings.append(np.nan)
+                psi=np.full(r.shape,np.nan)
+            results.append(psi)
+        if mpmath is not None:
+            rRef=r[::points//50]
+            ref=reference(rRef,n,l)
+            scale=np.max(np.abs(ref))
+            errors=[np.max(np.abs(res[::points//50]-ref))/scale for res in results]
+        else:
+            errors=[np.nan,np.nan]
+        print("%5d %5d %14.3e %14.3e %12.1f %12.1f"%(n,l,errors[0],errors[1],timings[0],timings[1]))
+
+
+if __name__=="__main__":
+    benchmarkRadial()
@@ -0,0 +1,112 @@
+# Evaluate the hydrogen probability density on 3D grids
+#
+# A full N^3 cube (e.g. 512^3) of r, theta, phi, X, Y and Z arrays would need many GB, so the cube is built
+# one slab of z values at a time. Only slab-sized temporaries ever exist, and the size of a slab is chosen so
+# that they fit into a fixed memory budget. The cube itself can be written to a memory-mapped .npy file, so
+# cubes bigger than the RAM can be made and then sliced lazily with loadCube.
+#
+# Like totalHydrogenRho in hydrogenWavefunction.py the density is r^2 |R_nl(r)|^2 |f_lm(theta)|^2, with
+# distances in Bohr radii. The cube is indexed as cube[iz,iy,ix].
+#
+# The density is separable, radial(r)*angular(theta), and does not depend on phi. On spherical grids each part
+# only needs evaluating along its own 1D axis and the grid is an outer product. On Cartesian grids the parts
+# can be interpolated from fine 1D tables instead of calling the special functions at every point.
+
+import numpy as np  #import the numpy library as np
+from hydrogen import radialPsi, angularRhoCos #Import the radial wavefunction and angular density
+
+
+#Part of the stateCache keys of cubes computed here, bump it whenever a change to this module or to the
+#hydrogen.py functions it uses changes the densities
+cacheVersion=1
+
+#A rough count of how many bytes of temporaries each grid point in a slab needs (about a dozen float64 arrays)
+bytesPerPoint=12*8
+
+
+#How many z planes of an N*N grid fit into memoryBytes of temporaries (always at least one)
+def slabSize(points,memoryBytes):
+    return max(1,min(points,int(memoryBytes//(bytesPerPoint*points*points))))
+
+
+#The radial part r^2 |R_nl(r)|^2 of the density
+def radialDensity(r,n,l):
+    return r**2*radialPsi(r,n,l)**2
+
+
+#The density on a spherical grid from the 1D axes r and theta, as density[itheta,ir].
+#If phi is given the result is broadcast (without copying) to density[iphi,itheta,ir] since nothing depends on phi
+def sphericalDensity(r,theta,n,l,m,phi=None):
+    density=np.outer(angularRhoCos(np.cos(theta),l,m),radialDensity(np.asarray(r,dtype=float),n,l))
+    if phi is None:
+        return density
+    return np.broadcast_to(density,(len(phi),)+density.shape)
+
+
+#Fine 1D tables of the radial part on 0<=r<=rMax and the angular part on -1<=cos(theta)<=1, for interpolating.
+#The angular density is a polynomial in cos(theta) so a uniform cos(theta) table is accurate everywhere.
+#Each table is (start, step, values, slopes) with slopes[i]=values[i+1]-values[i], for uniformInterp
+def separableTables(n,l,m,rMax,tablePoints=8192):
+    rTable=np.linspace(0,rMax,tablePoints)
+    cosTable=np.linspace(-1,1,tablePoints)
+    tables=[]
+    for start,stop,values in ((0,rMax,radialDensity(rTable,n,l)),(-1,1,angularRhoCos(cosTable,l,m))):
+        slopes=np.append(np.diff(values),0)  #The last entry is only used at exactly stop
+        tables.append((start,(stop-start)/(tablePoints-1),values,slopes))
+    return tables
+
+
+#Linear interpolation in a uniform table from separableTables. The table is uniform so the index of each point
+#is worked out directly, with none of the binary search np.interp does. x is used as workspace
+def uniformInterp(table,x):
+    start,step,values,slopes=table
+    x-=start
+    x/=step
+    np.clip(x,0,len(values)-1,out=x)
+    i=x.astype(np.intp)
+    x-=i  #The fraction of the way to the next entry
+    x*=slopes[i]
+    x+=values[i]
+    return x
+
+
+#The density on the grid x (along the last axis), y and z, for a slab of a few z values.
+#With tables from separableTables the two parts are interpolated rather than evaluated at every point
+def densitySlab(x,y,z,n,l,m,tables=None):
+    r2=(x**2)[None,None,:]+(y**2)[None,:,None]+(z**2)[:,None,None]  #Only r^2 has the full slab shape
+    r=np.sqrt(r2)
+    with np.errstate(invalid="ignore",divide="ignore"):
+        cosTheta=np.where(r>0,z[:,None,None]/r,1.0)  #theta is undefined at the origin, where r^2 kills the density anyway
+    if tables is not None:
+        radial=uniformInterp(tables[0],r)
+        radial*=uniformInterp(tables[1],cosTheta)
+        return radial
+    return r2*radialPsi(r,n,l)**2*angularRhoCos(cosTheta,l,m)
+
+
+#Build the density cube for (n,l,m) on points^3 points from -plotMax to plotMax (in Bohr radii).
+#  memoryBytes - budget for the temporaries of one slab
+#  filename    - if given, the cube is written to this memory-mapped .npy file instead of living in RAM
+#  dtype       - dtype of the stored cube (float32 halves the size of the file)
+#  separable   - interpolate from 1D tables of tablePoints points instead of evaluating at every point
+def densityCube(n,l,m,plotMax=30,points=128,memoryBytes=256*2**20,filename=None,dtype=np.float64,
+                separable=False,tablePoints=8192):
+    axis=np.linspace(-plotMax,plotMax,points)
+    shape=(points,points,points)
+    if filename is None:
+        cube=np.empty(shape,dtype=dtype)
+    else:
+        cube=np.lib.format.open_memmap(filename,mode="w+",dtype=dtype,shape=shape)
+    tables=separableTables(n,l,m,np.sqrt(3)*plotMax,tablePoints) if separable else None  #sqrt(3) plotMax is the corner
+    slab=slabSize(points,memoryBytes)
+    for start in range(0,points,slab):
+        stop=min(start+slab,points)
+        cube[start:stop]=densitySlab(axis,axis,axis[start:stop],n,l,m,tables)
+    if filename is not None:
+        cube.flush()  #Make sure everything is on disk
+    return cube
+
+
+#Open a cube written by densityCube without reading it, slicing it only reads the slices from disk
+def loadCube(filename):
+    return np.load(filename,mmap_mode="r")
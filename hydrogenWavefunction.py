@@ -26,20 +26,15 @@
 # $$ \text{Prob}(r_0 \leq r \leq r_1) = \int_{r_0}^{r_1} r^2 \rho_{nl}(r) dr $$
 
 # +
-# This import registers the 3D projection, but is otherwise unused.
-from mpl_toolkits.mplot3d import Axes3D  # noqa: F401 unused import
 import numpy as np  #import the numpy library as np
 import matplotlib.pyplot as plt #import the pyplot library as plt
 import matplotlib.style #Some style nonsense
 import matplotlib as mpl #Some more style nonsense
 from matplotlib import cm, colors
-import math  #Import math so that math.pi can be used
-import scipy.constants #Import scipy.constants so that hbar and electron_mass can be used
-from scipy.optimize import fsolve # Import fsolve for the numerical solving
-from scipy import integrate # Import integrate for numerical integration
-from scipy.special import genlaguerre #Import the general Lagueere polynomial
-from scipy.special import lpmv #Import the general Lagueere polynomial
-from scipy.special import sph_harm #Import the general Lagueere polynomial
+from hydrogen import radialPsiStack #Import the many-state radial function
+from wavefunctions import radialHydrogenrSqRho, totalHydrogenRho #The wavefunctions, shared with the other scripts
+from hydrogenGrid import densityCube, cacheVersion #Import the slab-by-slab 3D density evaluator
+from stateCache import scriptCache #Import the on-disk cache of expensive results
 
 #Set default figure size
 #mpl.rcParams['figure.figsize'] = [12.0, 8.0] #Inches... of course it is inches
@@ -47,31 +42,17 @@ mpl.rcParams["legend.frameon"] = False #Turn off the box around the legend
 mpl.rcParams['figure.dpi']=150 # dots per inch
 
 
-# +
-#Here we define the normalised radial hydrogen wavefunction as per the equation above
-def radialHydrogenPsi(r,n,l):
-    partA=(2.0/n)**3
-    partB=math.factorial(n-l-1)/(2*n*math.factorial(n+l))
-    sqrtPart=np.sqrt(partA*partB)
-    expPart=np.exp(-r/n)
-    partC=(2*r/n)**l
-    partD=scipy.special.genlaguerre(n-l-1,2*l+1)(2.*r/n)  
-    #special.genlaguerre(n-l-1,2*l+1) is a function to which we pass the argument (2.r/n)
-    return sqrtPart*expPart*partC*partD
-
-def radialHydrogenrSqRho(r,n,l):
-    return (r**2)*(radialHydrogenPsi(r,n,l)**2)  
-
-
-
 # -
 
+# The normalised radial wavefunction above is radialHydrogenPsi(r,n,l) in wavefunctions.py, with $r$ in units of $a_0$, and radialHydrogenrSqRho(r,n,l), imported at the top, is $r^2$ times its square. The square root part and the Laguerre polynomial only depend on $n$ and $l$, so they are worked out once and cached. For large $n$ the factorials overflow, so there a log-space version is used instead.
+
 #Now let's plot our wavefunction
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
 r=np.linspace(0,30,100)
-ax.plot(r,radialHydrogenPsi(r,1,0),linewidth=3,label=r"$R_{1,0}$") #Plot x vs sin (pi x)
-ax.plot(r,radialHydrogenPsi(r,2,0),linewidth=3,label=r"$R_{2,0}$") #Plot x vs sin (pi x)
-ax.plot(r,radialHydrogenPsi(r,3,0),linewidth=3,label=r"$R_{3,0}$") #Plot x vs sin (pi x)
+R=radialPsiStack(r,[(1,0),(2,0),(3,0)]) #All three radial wavefunctions in one go, R[i] is the i-th state
+ax.plot(r,R[0],linewidth=3,label=r"$R_{1,0}$") #Plot x vs sin (pi x)
+ax.plot(r,R[1],linewidth=3,label=r"$R_{2,0}$") #Plot x vs sin (pi x)
+ax.plot(r,R[2],linewidth=3,label=r"$R_{3,0}$") #Plot x vs sin (pi x)
 ax.set_title(r"Hydrogen Radial Wavefunction")  #Set the title
 ax.set_xlabel("$r (a_0)$") # Set the x-axis label
 ax.set_ylabel("$R_{nl}(r)$") # Set the y-axis label
@@ -102,18 +83,7 @@ ax.legend() #Add the legend
 # $$ \rho_{nlm}(r,\theta,\phi) = \left| R_{nl}(r) f_{lm}(\theta) g_m(\phi) \right|^2 $$
 #
 
-# +
-#Define the angular hydrogen probability density as the modulus square of the above 
-def angularHydrogenRho(theta,phi,l,m):
-    partA=(2*l+1)*math.factorial(l-m)/(4*math.pi*math.factorial(l+m))
-    return partA*(lpmv(m,l,np.cos(theta))**2)
-
-#The total probability density is just the radial times the angular
-def totalHydrogenRho(r,theta,phi,n,l,m):
-    return radialHydrogenrSqRho(r,n,l)*angularHydrogenRho(theta,phi,l,m)
-
-
-# -
+# The angular probability density $\left| f_{lm}(\theta) g_m(\phi) \right|^2$ is angularHydrogenRho(theta,phi,l,m) in wavefunctions.py. Since $\left| g_m(\phi) \right|^2=1$, $\phi$ drops out, and $\left| f_{lm} \right|^2$ comes from a recurrence over $m$ which is accurate for large $l$. The total probability density totalHydrogenRho(r,theta,phi,n,l,m), imported at the top, is just the radial times the angular.
 
 # ## Plotting slices
 #
@@ -137,7 +107,7 @@ n=4  #Pick your n value... too big and you'll need to change plotMax above
 l=1 # Pick your l value remembering 0<= l <= n-1
 m=-1# Pick your m value remembereing -l <= m <= l
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
-ax.imshow(totalHydrogenRho(r,phi,theta,n,l,m).T,extent=[-plotMax,plotMax,-plotMax,plotMax],interpolation="none",origin="lower")
+ax.imshow(totalHydrogenRho(r,theta,phi,n,l,m).T,extent=[-plotMax,plotMax,-plotMax,plotMax],interpolation="none",origin="lower")
 ax.set_xlabel(r"$x (a_0)$")
 ax.set_ylabel(r"$y (a_0)$")
 ax.set_title("Hydrogen Probability Density for n="+str(n)+", l="+str(l)+", m="+str(m))
@@ -145,3 +115,21 @@ ax.set_title("Hydrogen Probability Density for n="+str(n)+", l="+str(l)+", m="+s
 # Those of you interested in computational physics might like to work out how to create a 3D version of the probability density plot. 
 
 
+
+# +
+#densityCube builds the full 3D probability density one slab of z at a time, so even big cubes
+#only need a small amount of memory (pass filename="cube.npy" to keep the cube on disk instead).
+#Set cacheDir to a directory (or set the WAVEFUNCTION_CACHE environment variable) to keep the cube in an on-disk
+#cache, so running this again with the same n, l, m, grid and dtype just loads it. Otherwise nothing is written
+cacheDir=None
+cache=scriptCache(cacheDir)
+cube=cache.fetch("densityCube",{"n":n,"l":l,"m":m,"plotMax":plotMax,"points":128,"dtype":"float64"},
+                 lambda: {"rho":densityCube(n,l,m,plotMax,128,dtype=np.float64)},
+                 version=cacheVersion)["rho"]  #cube[iz,iy,ix] with 128 points along each axis
+
+#Now we can look at the x-z plane (the y=0 slice) which shows the lobes above and below the z=0 slice
+fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
+ax.imshow(cube[:,64,:],extent=[-plotMax,plotMax,-plotMax,plotMax],interpolation="none",origin="lower")
+ax.set_xlabel(r"$x (a_0)$")
+ax.set_ylabel(r"$z (a_0)$")
+ax.set_title("Hydrogen Probability Density for n="+str(n)+", l="+str(l)+", m="+str(m)+" at y=0")
@@ -20,7 +20,7 @@ import numpy as np  #import the numpy library as np
 import matplotlib.pyplot as plt #import the pyplot library as plt
 import matplotlib.style #Some style nonsense
 import matplotlib as mpl #Some more style nonsense
-import math #Import math so that math.pi can be used
+from wavefunctions import infiniteV, infinitePsi #The potential and states, shared with the other scripts
 
 #Set default figure size
 #mpl.rcParams['figure.figsize'] = [12.0, 8.0] #Inches... of course it is inches
@@ -39,16 +39,8 @@ mpl.rcParams['figure.dpi']=150 # dots per inch
 # \end{cases}$$
 #
 # Now we will try and plot this function... obviously we can't plot infinity so to plot it below we have just picket an arbitrary number (1000)
-
-# +
-#Define a function which will operate on an array of x values all at once
-def infiniteV(x):
-    conds = [x < 0, (x >= 0) & (x <= 1), x > 1]   #The three regions of x
-    funcs = [lambda x: 1000, lambda x: 0,  #0 in the middle and 1000 outsides
-            lambda x: 1000]  #the lambda keyword is allowing us to define a quick function
-    return np.piecewise(x, conds, funcs)  #Now do the piecewise calculation and return it
-    
-    
+#
+# The function infiniteV, imported from wavefunctions.py at the top, does this for $L=1$ on an array of $x$ values all at once: it is 0 for $0 \leq x \leq 1$ and 1000 everywhere else.
 
 # +
 #Now let's plot our potential
@@ -81,18 +73,7 @@ ax.annotate(r'$V(x)=\infty$', xy=(-0.25,500), xycoords="data",  #Label on left-h
 # 0 & \text{otherwise}
 # \end{cases}$$
 #
-#
-
-# +
-#Define a function which will operate on an array of x values all at once
-def infinitePsi(x,n):
-    conds = [x < 0, (x >= 0) & (x <= 1), x > 1]   #The three regions of x
-    funcs = [lambda x: 0, lambda x: np.sqrt(2)*np.sin(n*math.pi*x),  # sqrt(2)*sin(n pi x) in the middle and 0 outsides
-            lambda x: 0]  #the lambda keyword is allowing us to define a quick function
-    return np.piecewise(x, conds, funcs)  #Now do the piecewise calculation and return it
-    
-    
-# -
+# The function infinitePsi(x,n), imported from wavefunctions.py at the top, is this solution for $L=1$ on an array of $x$ values all at once: $\sqrt{2} \sin(n \pi x)$ for $0 \leq x \leq 1$ and 0 everywhere else.
 
 # ### Let's plot those wavefunctions
 
@@ -22,6 +22,8 @@ import matplotlib.pyplot as plt #import the pyplot library as plt
 import matplotlib.style #Some style nonsense
 import matplotlib as mpl #Some more style nonsense
 import math 
+from wavepacket import planeWavePacket #Import the wavepacket engine
+from fastPiecewise import piecewiseEval #A faster version of np.piecewise
 
 #Set default figure size
 #mpl.rcParams['figure.figsize'] = [12.0, 8.0] #Inches... of course it is inches
@@ -39,14 +41,15 @@ mpl.rcParams['figure.dpi']=150 # dots per inch
 # 0 & \text{otherwise}
 # \end{cases}$$
 #
-# We will use the python numpy library to code up this function using the piecewise method. Note that the $x$ below will refer to an array of numbers rather than just a single number, which means we have to be careful how we define the conditions and the function.
+# We will code up this function piecewise with piecewiseEval from fastPiecewise.py, a faster version of the numpy piecewise method. Note that the $x$ below will refer to an array of numbers rather than just a single number, so rather than testing a condition for each region we give the breakpoints between the regions, which region each breakpoint belongs to, and a function (or a constant) for each region.
 
 #Define a function which will operate on an array of x values all at once
-def sinpix(x):
-    conds = [x < 0, (x >= 0) & (x <= 2), x > 2]   #The three regions of x
-    funcs = [lambda x: 0, lambda x: np.sin(math.pi*x),  # sin(pi x) in the middle and 0 outsides
-            lambda x: 0]  #the lambda keyword is allowing us to define a quick function
-    return np.piecewise(x, conds, funcs)  #Now do the piecewise calculation and return it
+def sinpix(x,out=None):
+    breaks = [0, 2]   #The three regions of x are x<0, 0<=x<=2 and x>2
+    sides = ["left", "right"]  #Both x=0 and x=2 belong to the middle region
+    funcs = [0, lambda x: np.sin(math.pi*x),  #the lambda keyword is allowing us to define a quick function
+            0]  # sin(pi x) in the middle and 0 outsides, constant regions are just filled in
+    return piecewiseEval(x, breaks, sides, funcs, out=out)  #Now do the piecewise calculation and return it
 
 
 #Now we will use the linspace function to get 100 numbers
@@ -123,13 +126,11 @@ ax.set_xlim(-20,20) # Set the x-axis limits to be -20, 20
 # The first sine wave will be sin (x)
 # The second (if n>0) will be sin (x * (1-delta) )
 # The third (if n>1) will be sin (x * (1-2*delta) ) and so on
+# Rather than looping over the waves, planeWavePacket adds up exp(i f x) for all of the frequencies at once
+# and the sines are the imaginary part
 def addSin(x,n,delta):
-    y=np.sin(x)  # Here is the contribution from sin(x)
-    f=1  # Initial frequency
-    if n>0:  # If n>0 add in addtional waves
-        for i in range(n):  # Loop over n
-            f=f-delta  # Get new frequency
-            y=y+np.sin(f*x) # Add new wave to y
+    f=1-delta*np.arange(n+1)  # The frequencies 1, 1-delta, 1-2*delta, ... 1-n*delta
+    y=planeWavePacket(x,0,f,amps=1.0).imag[0]  # sum of sin(f x) at time t=0
     return y/(n+1)  # Divide y by (n+1)
 
 fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
@@ -142,6 +143,22 @@ ax.set_title(r"Multiple $\sin$s")  # Set the plot title
 ax.set_xlabel("$x$") # Set the x-axis label
 ax.set_ylabel(r"$\psi(x)$") # Set the y-axis label
 ax.grid() # Draw a grid
+# -
+
+# +
+# Wavepackets also move! Each wave travels as sin(k x - omega t) with omega=k^2/2 for a free particle,
+# and planeWavePacket works out the packet at every time in one go
+fig, ax = plt.subplots()  #I like to make plots using this silly fig,ax method but plot how you like
+x = np.linspace(-20, 40, 3000) # Get 3000 numbers linearly spaced between -20 and 40
+t = np.array([0,10,20]) # The times to plot
+k = np.linspace(0.5,1.5,50) # 50 waves with wavenumbers between 0.5 and 1.5
+psi = planeWavePacket(x,t,k,amps=np.exp(-((k-1)/0.15)**2)) # psi[i] is the packet at time t[i]
+for i in range(len(t)): # Loop over times
+    ax.plot(x,psi[i].imag,label="t="+str(t[i]))  #Plot x vs the packet at time t[i]
+ax.set_title(r"A moving wavepacket")  # Set the plot title
+ax.set_xlabel("$x$") # Set the x-axis label
+ax.set_ylabel(r"$\psi(x,t)$") # Set the y-axis label
+ax.legend() # Add the legend
 
 # +
 #
@@ -0,0 +1,179 @@
+# Expectation values of a 1D wavefunction (or a whole stack of them) from one set of samples
+#
+# For psi(x) on a <= x <= b
+#   norm = int |psi|^2 dx
+#   <x^j> = int x^j |psi|^2 dx / norm
+#   <p>   = -i hbar int psi* psi' dx / norm = hbar Im(int psi* psi' dx) / norm
+#   <p^2> = hbar^2 int |psi'|^2 dx / norm                  (psi is assumed to vanish at a and b)
+# and the uncertainties Delta x = sqrt(<x^2>-<x>^2), Delta p = sqrt(<p^2>-<p>^2).
+#
+# psi is evaluated once, at the nodes of a quadrature rule that is applied separately between each pair of
+# breakpoints, so kinks (e.g. psiq4 at 0, a and b) never sit inside a panel:
+#   "gauss"   - Gauss-Legendre with order nodes on each of panels equal panels per region. psi' comes from
+#               the polynomial through the nodes of each panel (a differentiation matrix), so it is as
+#               accurate as the integrals
+#   "simpson" - Simpson's rule on points evenly spaced points per region, with psi' from np.gradient
+# Then everything that is an integral of |psi|^2 against a weight (norm, <x>, <x^2> and the probability of each
+# region) is a single matrix product of a (weights x nodes) matrix with the (nodes x states) densities.
+#
+# psi(x) may return one state (shape (len(x),)) or a stack (shape (number of states, len(x))), real or complex.
+# For a stack every entry of the result is an array with one value per state.
+
+import numpy as np  #import the numpy library as np
+import math  #Import math for factorial
+import functools  #Import functools for lru_cache
+
+from fastPiecewise import ExpTail  #Exponential region functions with exact integrals
+
+
+#Gauss-Legendre nodes on [-1,1] and the matrix which turns values at the nodes into derivatives there
+@functools.lru_cache(maxsize=None)
+def legendrePanel(order):
+    t,w=np.polynomial.legendre.leggauss(order)
+    #Barycentric weights 1/prod_{k!=j}(t_j-t_k) give D_ij = (lambda_j/lambda_i)/(t_i-t_j), D_ii = -sum_j D_ij
+    difference=t[:,np.newaxis]-t[np.newaxis,:]
+    np.fill_diagonal(difference,1)
+    bary=1/np.prod(difference,axis=1)
+    D=(bary[np.newaxis,:]/bary[:,np.newaxis])/difference
+    np.fill_diagonal(D,0)
+    np.fill_diagonal(D,-D.sum(axis=1))
+    for a in (t,w,D):
+        a.setflags(write=False)
+    return t,w,D
+
+
+#The edges of the smooth regions: a, every breakpoint strictly between a and b, and b
+def regionEdgeList(a,b,breaks=()):
+    return [a]+sorted(set(float(c) for c in breaks if a<c<b))+[b]
+
+
+#Gauss-Legendre nodes and weights for [a,b] with panels panels of order nodes in each region between breakpoints.
+#Returns (x, w, panelWidths) with x and w of length (number of panels)*order, in increasing x
+def gaussGrid(a,b,breaks=(),order=20,panels=2):
+    t,w,D=legendrePanel(order)
+    regionEdges=regionEdgeList(a,b,breaks)
+    edges=np.concatenate([np.linspace(lo,hi,panels+1)[:-1] for lo,hi in zip(regionEdges[:-1],regionEdges[1:])]+[[b]])
+    width=np.diff(edges)
+    centre=0.5*(edges[:-1]+edges[1:])
+    x=(centre[:,np.newaxis]+0.5*width[:,np.newaxis]*t).ravel()
+    weights=(0.5*width[:,np.newaxis]*w).ravel()
+    return x,weights,width
+
+
+#Composite Simpson nodes and weights for [a,b] with points (odd) evenly spaced points in each region.
+#Returns (x, w, regionSlices) where regionSlices picks out each region's points
+def simpsonGrid(a,b,breaks=(),points=201):
+    points=points+1-points%2  #Simpson's rule needs an odd number of points
+    edges=regionEdgeList(a,b,breaks)
+    xs=[]
+    ws=[]
+    slices=[]
+    for lo,hi in zip(edges[:-1],edges[1:]):
+        h=(hi-lo)/(points-1)
+        weights=np.full(points,2.0)
+        weights[1::2]=4
+        weights[0]=weights[-1]=1
+        slices.append(slice(len(xs)*points,(len(xs)+1)*points))
+        xs.append(np.linspace(lo,hi,points))
+        ws.append(weights*h/3)
+    return np.concatenate(xs),np.concatenate(ws),slices
+
+
+#Every observable of psi on [a,b] from one evaluation of psi, see the top of the file.
+#  breaks  - places where psi or its derivative jumps (e.g. [0,a,b] for psiq4)
+#  regions - list of (lo,hi) pairs, the probability of finding the particle in each is returned
+#  dpsi    - optional function giving psi'(x) exactly, instead of differentiating the samples
+#Returns a dict with entries norm, x, x2, p, p2, deltaX, deltaP, uncertainty (=Delta x Delta p) and regions
+#(an array of probabilities, one row per region, divided by the norm)
+def observables(psi,a,b,breaks=(),regions=(),rule="gauss",order=20,panels=2,points=201,hbar=1.0,dpsi=None):
+    breaks=list(breaks)+[edge for region in regions for edge in region]  #Region edges never cut a panel
+    if rule=="gauss":
+        x,w,width=gaussGrid(a,b,breaks,order,panels)
+        owner=np.repeat(np.cumsum(width)-0.5*width+a,order)  #The centre of the panel each node is in
+    elif rule=="simpson":
+        x,w,slices=simpsonGrid(a,b,breaks,points)
+        owner=np.concatenate([np.full(s.stop-s.start,0.5*(x[s.start]+x[s.stop-1])) for s in slices])
+    else:
+        raise ValueError("Unknown rule "+str(rule))
+
+    values=np.asarray(psi(x))
+    single=values.ndim==1
+    values=np.atleast_2d(values)  #(states x nodes)
+    if dpsi is not None:
+        slope=np.atleast_2d(np.asarray(dpsi(x)))
+    elif rule=="gauss":  #Differentiate the polynomial through each panel's nodes
+        t,wRef,D=legendrePanel(order)
+        panelValues=values.reshape(values.shape[0],-1,order)
+        slope=(np.matmul(panelValues,D.T)*(2/width)[:,np.newaxis]).reshape(values.shape)
+    else:
+        slope=np.empty_like(values)
+        for s in slices:
+            slope[:,s]=np.gradient(values[:,s],x[s],axis=1,edge_order=2)
+
+    #All of the |psi|^2 integrals in one matrix product
+    #(the end points of Simpson regions appear twice, so each node goes by the centre of its panel or region)
+    weightRows=[w,w*x,w*x**2]+[w*((owner>lo)&(owner<hi)) for lo,hi in regions]
+    density=(values*values.conj()).real
+    moments=np.stack(weightRows)@density.T  #(weights x states)
+    norm=moments[0]
+    meanX=moments[1]/norm
+    meanX2=moments[2]/norm
+    meanP=hbar*((values.conj()*slope)@w).imag/norm
+    meanP2=hbar**2*((slope*slope.conj()).real@w)/norm
+    deltaX=np.sqrt(np.maximum(meanX2-meanX**2,0))
+    deltaP=np.sqrt(np.maximum(meanP2-meanP**2,0))
+    result={"norm":norm,"x":meanX,"x2":meanX2,"p":meanP,"p2":meanP2,"deltaX":deltaX,"deltaP":deltaP,
+            "uncertainty":deltaX*deltaP,"regions":moments[3:]/norm}
+    if single:
+        result={key:(value[...,0] if key=="regions" else float(value[0])) for key,value in result.items()}
+    return result
+
+
+# When a wavefunction is written as breaks, sides and funcs (the arguments of piecewiseEval, e.g. from
+# psiq4Regions or finitePsiRegions) the moments int x^j |psi|^2 dx over the whole real line can be done one
+# region at a time:
+#   constant c     - c^2 (hi^{j+1} - lo^{j+1})/(j+1), which must be 0 on an infinite region
+#   ExpTail A e^{rx} - exactly, using the antiderivative of x^j e^{sx} with s=2r,
+#                    e^{sx} sum_{i=0}^{j} (-1)^{j-i} j!/i! x^i / s^{j-i+1}
+#   anything else  - order point Gauss-Legendre on each of panels panels, which is exact to rounding for smooth
+#                    functions like sin and polynomials once order is a few tens
+# so the integral never sees a kink, and the infinite tails cost no evaluations at all.
+
+#The antiderivative of x^j e^{sx} at x (zero at x=-inf for s>0 and at x=+inf for s<0).
+#A tail that doesn't decay towards an infinite x has no finite integral, so that raises ValueError
+def expMomentAntiderivative(x,s,j):
+    if np.isinf(x):
+        if s*x>=0 or np.isnan(s*x):  #s=0 gives nan, a constant tail
+            raise ValueError("An ExpTail must decay towards an infinite edge to be normalised")
+        return 0.0
+    return math.exp(s*x)*sum((-1)**(j-i)*math.factorial(j)/math.factorial(i)*x**i/s**(j-i+1) for i in range(j+1))
+
+
+#The moments int x^j |psi|^2 dx for j in moments, where psi is the piecewise function (breaks, sides, funcs).
+#Returns an array with one entry per moment, so regionMoments(*psiq4Regions(A,a,b)) is [norm, int x|psi|^2,
+#int x^2|psi|^2]. Regions can be restricted to lo <= x <= hi
+def regionMoments(breaks,sides,funcs,moments=(0,1,2),order=20,panels=1,lo=-np.inf,hi=np.inf):
+    edges=[-np.inf]+list(breaks)+[np.inf]
+    total=np.zeros(len(moments))
+    for f,left,right in zip(funcs,edges[:-1],edges[1:]):
+        left,right=max(left,lo),min(right,hi)
+        if right<=left:
+            continue
+        if isinstance(f,ExpTail):
+            if f.amplitude==0:
+                continue
+            s=2*f.rate
+            total+=[f.amplitude**2*(expMomentAntiderivative(right,s,j)-expMomentAntiderivative(left,s,j))
+                    for j in moments]
+        elif not callable(f):
+            if f!=0 and np.isinf(right-left):
+                raise ValueError("A non-zero constant region can't be normalised")
+            total+=[f**2*(right**(j+1)-left**(j+1))/(j+1) if f!=0 else 0.0 for j in moments]
+        elif np.isinf(right-left):
+            raise ValueError("Infinite regions must be constant or an ExpTail")
+        else:
+            x,w,width=gaussGrid(left,right,(),order,panels)
+            values=np.asarray(f(x))
+            density=(values*np.conj(values)).real*w
+            total+=[np.sum(density*x**j) for j in moments]
+    return total
@@ -0,0 +1,96 @@
+# Split-operator (split-step Fourier) time evolution in any 1D potential
+#
+# Over a short time dt the evolution operator exp(-i H dt/hbar) with H = p^2/2m + V(x) is approximated by
+#   exp(-i V dt/(2 hbar)) exp(-i p^2 dt/(2 m hbar)) exp(-i V dt/(2 hbar))
+# The potential part is a multiplication in x and the kinetic part is a multiplication in k, with FFTs in
+# between. The error per step is O(dt^3), and since every factor is a pure phase the norm is conserved.
+#
+# Both phase arrays are worked out once, and the state lives in a single complex128 buffer which every step
+# changes in place. If pyfftw is installed its in-place FFTW plans are built once and reused. Otherwise scipy.fft
+# is used, which caches its plans and with overwrite_x transforms a contiguous complex128 buffer in place.
+# Either way a step allocates no new arrays.
+#
+# The potential can be any function of x, e.g. finiteV, or an array. A complex potential (negative imaginary
+# part near the edges) makes an absorbing boundary for scattering runs.
+
+import numpy as np  #import the numpy library as np
+
+try:
+    import pyfftw  #Optional, gives in-place FFT plans
+except ImportError:
+    pyfftw=None
+import scipy.fft #Import scipy.fft for when pyfftw isn't there
+
+
+class SplitStepPropagator:
+    #x must be evenly spaced. V is a function of x or an array, psi0 the initial state (a function of x or
+    #an array), dt the time step. hbar and mass default to 1, pass the scipy.constants values for SI units.
+    #threads is the number of threads for the FFTs
+    def __init__(self,x,V,psi0,dt,hbar=1.0,mass=1.0,threads=1):
+        self.x=np.asarray(x,dtype=float)
+        self.dt=dt
+        self.time=0.0
+        N=self.x.size
+        dx=self.x[1]-self.x[0]
+        V=V(self.x) if callable(V) else np.asarray(V)
+        psi0=psi0(self.x) if callable(psi0) else psi0
+        k=2*np.pi*np.fft.fftfreq(N,dx)  #The wavenumber of each FFT bin
+
+        #The precomputed phases. The FFTs below are unnormalised in both directions so 1/N goes in the kinetic part
+        self.halfPotential=np.exp(-0.5j*V*dt/hbar).astype(np.complex128)
+        self.fullPotential=self.halfPotential**2
+        self.kinetic=(np.exp(-1j*hbar*k**2*dt/(2*mass))/N).astype(np.complex128)
+
+        if pyfftw is not None:
+            self.psi=pyfftw.empty_aligned(N,dtype=np.complex128)
+            self.forward=pyfftw.FFTW(self.psi,self.psi,direction="FFTW_FORWARD",threads=threads)
+            self.backward=pyfftw.FFTW(self.psi,self.psi,direction="FFTW_BACKWARD",threads=threads)
+        else:
+            self.psi=np.empty(N,dtype=np.complex128)
+            self.threads=threads
+        self.psi[:]=psi0
+
+    #scipy.fft normally hands back the buffer it was given, but if it ever makes a new array copy it over
+    def copyBack(self,result):
+        if not np.shares_memory(result,self.psi):
+            self.psi[:]=result
+
+    #Transform the buffer to k space and back, in place
+    def toMomentum(self):
+        if pyfftw is not None:
+            self.forward.execute()
+        else:
+            self.copyBack(scipy.fft.fft(self.psi,norm="backward",overwrite_x=True,workers=self.threads))
+
+    def toPosition(self):
+        if pyfftw is not None:
+            self.backward.execute()
+        else:
+            self.copyBack(scipy.fft.ifft(self.psi,norm="forward",overwrite_x=True,workers=self.threads))
+
+    #Advance the state by steps time steps. The half potential steps at the end of one step and the start of
+    #the next are merged into one full potential step, so steps time steps cost steps+1 potential multiplications
+    def step(self,steps=1):
+        if steps<1:
+            return self.psi
+        psi=self.psi
+        np.multiply(psi,self.halfPotential,out=psi)
+        for i in range(steps):
+            self.toMomentum()
+            np.multiply(psi,self.kinetic,out=psi)
+            self.toPosition()
+            np.multiply(psi,self.fullPotential if i<steps-1 else self.halfPotential,out=psi)
+        self.time+=steps*self.dt
+        return psi
+
+    #|psi|^2 on the grid, written into out if given
+    def density(self,out=None):
+        if out is None:
+            out=np.empty(self.psi.shape)
+        np.multiply(self.psi.real,self.psi.real,out=out)
+        out+=self.psi.imag**2
+        return out
+
+    #The total probability, which should stay at its initial value (unless the potential absorbs)
+    def norm(self):
+        return float(np.vdot(self.psi,self.psi).real*(self.x[1]-self.x[0]))
@@ -0,0 +1,178 @@
+# A content addressed on-disk cache for energies, normalisations and sampled wavefunctions
+#
+# Anything expensive (the finite well energies, hydrogen radial arrays, 3D density cubes, ...) is stored under
+# a key made from a name and the parameters it was computed from, including the grid, e.g.
+#   cache.fetch("finiteWell",{"U":25,"L":0.5e-9,"m":m},compute)
+# where compute() returns a dict of arrays. Parameters may be numbers, strings, tuples/lists or numpy arrays
+# (an array of x values is hashed by its dtype, shape and bytes), and the key is the SHA-256 of all of that,
+# so changing any parameter or any grid point gives a new entry.
+#
+# Each entry is a directory of .npy files, one per array, which are loaded memory mapped so a big cube is only
+# read as far as it is used. Entries are written to a temporary directory and renamed into place, so several
+# processes can share one cache and a crash never leaves half an entry behind. Every hit updates the entry's
+# modification time, and when the cache grows past maxBytes the least recently used entries are deleted.
+#
+# A key also includes cacheSchema (the layout of the entries) and a version from the code that produced the
+# arrays, e.g. finiteWell.cacheVersion, so entries made by older code are never handed back:
+#   cache.fetch("finiteWell",{"U":25,"L":0.5e-9,"m":m},compute,version=finiteWell.cacheVersion)
+# Whoever changes what a producer computes bumps its version, and the old entries are then just never used again
+# (the least recently used trimming removes them in the end).
+#
+# A StateCache lives in the directory it is given, or in the one named by the WAVEFUNCTION_CACHE environment
+# variable, or ~/.cache/wavefunctions if that isn't set either. The notebook scripts don't write anything to
+# disk unless asked to: they use scriptCache, which is a NoCache (compute every time) unless they are given a
+# directory or WAVEFUNCTION_CACHE is set.
+
+import numpy as np  #import the numpy library as np
+import os  #Import os for the file handling
+import json  #Import json to save the parameters next to each entry
+import shutil  #Import shutil to delete whole entries
+import hashlib  #Import hashlib for the keys
+import tempfile  #Import tempfile for the half-written entries
+
+
+#The layout of the entries and of the keys, bump it if hashParameter or the files in an entry change
+cacheSchema=1
+
+
+#Where the cache lives unless told otherwise
+def defaultCacheDir():
+    return os.environ.get("WAVEFUNCTION_CACHE",os.path.join(os.path.expanduser("~"),".cache","wavefunctions"))
+
+
+#Feed a parameter into the hash in a form that doesn't depend on how it was written (1 and 1.0 are the same)
+def hashParameter(h,value):
+    if isinstance(value,np.ndarray):
+        value=np.ascontiguousarray(value)
+        h.update(("array"+str(value.dtype)+str(value.shape)).encode())
+        h.update(value.tobytes())
+    elif isinstance(value,dict):
+        h.update(b"dict")
+        for key in sorted(value):
+            h.update(str(key).encode())
+            hashParameter(h,value[key])
+    elif isinstance(value,(list,tuple)):
+        h.update(("list"+str(len(value))).encode())
+        for v in value:
+            hashParameter(h,v)
+    elif isinstance(value,(bool,np.bool_,str)) or value is None:
+        h.update(repr(value).encode())
+    else:
+        h.update(repr(float(value)).encode())  #Every other number as its exact float value
+
+
+#The key of an entry: the SHA-256 of cacheSchema, the name, the version of the producing code and the parameters
+def cacheKey(name,params,version=0):
+    h=hashlib.sha256(("schema"+str(cacheSchema)+name).encode())
+    hashParameter(h,version)
+    hashParameter(h,params)
+    return h.hexdigest()
+
+
+#A readable copy of the parameters for the entry's params.json (arrays are summarised, they're in the key)
+def describeParameter(value):
+    if isinstance(value,np.ndarray):
+        return {"array":str(value.dtype),"shape":list(value.shape)}
+    if isinstance(value,dict):
+        return {str(k):describeParameter(v) for k,v in value.items()}
+    if isinstance(value,(list,tuple)):
+        return [describeParameter(v) for v in value]
+    if isinstance(value,(str,bool)) or value is None:
+        return value
+    return float(value)
+
+
+class StateCache:
+    #directory defaults to defaultCacheDir(), maxBytes is the size the cache is trimmed back to
+    def __init__(self,directory=None,maxBytes=2**30):
+        self.directory=defaultCacheDir() if directory is None else directory
+        self.maxBytes=maxBytes
+        os.makedirs(self.directory,exist_ok=True)
+
+    def entryPath(self,key):
+        return os.path.join(self.directory,key)
+
+    #The arrays stored for (name, params) by version of the producing code as a dict, or None if there aren't any.
+    #mmap_mode is passed to np.load ("r" by default, None reads everything into memory)
+    def get(self,name,params,mmap_mode="r",version=0):
+        path=self.entryPath(cacheKey(name,params,version))
+        try:
+            files=[f for f in os.listdir(path) if f.endswith(".npy")]
+            arrays={f[:-4]:np.load(os.path.join(path,f),mmap_mode=mmap_mode) for f in files}
+            os.utime(path)  #Most recently used
+        except FileNotFoundError:  #Missing, or evicted by another process while we were reading
+            return None
+        return arrays
+
+    #Store a dict of arrays for (name, params), replacing nothing if another process got there first
+    def put(self,name,params,arrays,version=0):
+        key=cacheKey(name,params,version)
+        path=self.entryPath(key)
+        temporary=tempfile.mkdtemp(prefix=".tmp-",dir=self.directory)
+        for arrayName,value in arrays.items():
+            np.save(os.path.join(temporary,arrayName+".npy"),np.asarray(value))
+        with open(os.path.join(temporary,"params.json"),"w") as f:
+            json.dump({"name":name,"version":describeParameter(version),"params":describeParameter(params)},f)
+        try:
+            os.rename(temporary,path)
+        except OSError:  #Already there
+            shutil.rmtree(temporary,ignore_errors=True)
+        self.evict()
+        return key
+
+    #The cached arrays for (name, params), working them out with compute() and storing them if needed.
+    #version identifies the code behind compute (a number, string or tuple of them), bump it when that changes
+    def fetch(self,name,params,compute,mmap_mode="r",version=0):
+        arrays=self.get(name,params,mmap_mode,version)
+        if arrays is None:
+            arrays={k:np.asarray(v) for k,v in compute().items()}
+            self.put(name,params,arrays,version)
+        return arrays
+
+    #Size in bytes and last use of every entry, oldest first
+    def entries(self):
+        found=[]
+        for key in os.listdir(self.directory):
+            path=self.entryPath(key)
+            if key.startswith(".tmp-") or not os.path.isdir(path):
+                continue
+            try:
+                size=sum(os.path.getsize(os.path.join(path,f)) for f in os.listdir(path))
+                found.append((os.path.getmtime(path),size,key))
+            except FileNotFoundError:  #Evicted by someone else
+                continue
+        return sorted(found)
+
+    #Delete least recently used entries until the cache fits in maxBytes
+    def evict(self):
+        found=self.entries()
+        total=sum(size for used,size,key in found)
+        for used,size,key in found:
+            if total<=self.maxBytes:
+                break
+            shutil.rmtree(self.entryPath(key),ignore_errors=True)
+            total-=size
+
+    #Delete every entry
+    def clear(self):
+        for used,size,key in self.entries():
+            shutil.rmtree(self.entryPath(key),ignore_errors=True)
+
+
+#Stands in for a StateCache when caching is switched off: nothing is stored and fetch always computes
+class NoCache:
+    def get(self,name,params,mmap_mode="r",version=0):
+        return None
+
+    def put(self,name,params,arrays,version=0):
+        return cacheKey(name,params,version)
+
+    def fetch(self,name,params,compute,mmap_mode="r",version=0):
+        return {k:np.asarray(v) for k,v in compute().items()}
+
+
+#The cache for the notebook scripts, which only cache on disk when asked to: a StateCache in directory, or in
+#WAVEFUNCTION_CACHE if directory is None and that is set, and a NoCache otherwise
+def scriptCache(directory=None):
+    directory=os.environ.get("WAVEFUNCTION_CACHE") if directory is None else directory
+    return NoCache() if directory is None else StateCache(directory)
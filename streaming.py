@@ -0,0 +1,97 @@
+# Evaluate a wavefunction on a huge evenly spaced grid a chunk at a time, in constant memory
+#
+# psi(np.linspace(a,b,points)) needs the whole grid, the whole psi and every temporary of the same size in
+# memory at once, which for 10^9 points is tens of GB. streamGrid instead walks along the grid in chunks of
+# chunk points and yields (x, psi, rho) for each one. The three arrays are the same buffers every time (the
+# last chunk gets shorter views of them), so nothing grid-sized is ever allocated: copy a chunk if you want
+# to keep it. x is worked out from the point index, x_i = a + i dx, so it never drifts however long the grid.
+#
+# streamReduce uses it to accumulate the norm, <x>, <x^2> and the largest |psi| and rho as it goes. The
+# integrals use the trapezium rule over the whole grid, exactly as np.trapz on the full arrays would.
+
+import numpy as np  #import the numpy library as np
+
+
+#Yield (x, psi, rho) for consecutive chunks of the grid of points points from a to b (like np.linspace).
+#  psi      - a function of x. With hasOut=True it is called as psi(x,out=buffer) and writes into the buffer
+#             (infinitePsi, finitePsi, psiq3a-e, psiq4, ... in wavefunctions.py all take out=), otherwise its
+#             result is copied into the buffer. rho is psi^2, so finitePsi gives finitePDF
+#  dtype    - float for real wavefunctions, complex for complex ones
+#The arrays are reused for the next chunk, so copy them if you need them later
+def streamGrid(psi,a,b,points,chunk=2**20,hasOut=False,dtype=float):
+    dx=(b-a)/(points-1) if points>1 else 0.0
+    index=np.arange(chunk,dtype=float)
+    xBuffer=np.empty(chunk)
+    psiBuffer=np.empty(chunk,dtype=dtype)
+    rhoBuffer=np.empty(chunk)
+    for start in range(0,points,chunk):
+        size=min(chunk,points-start)
+        x,values,rho=xBuffer[:size],psiBuffer[:size],rhoBuffer[:size]
+        np.multiply(index[:size],dx,out=x)
+        x+=a+start*dx
+        if start+size==points and points>1:
+            x[-1]=b  #Land exactly on the end, like np.linspace (a single point is just a)
+        if hasOut:
+            psi(x,out=values)
+        else:
+            values[...]=psi(x)
+        if np.iscomplexobj(values):
+            np.multiply(values.real,values.real,out=rho)
+            rho+=values.imag**2
+        else:
+            np.multiply(values,values,out=rho)
+        yield x,values,rho
+
+
+#The norm, <x>, <x^2>, the largest |psi| (and where it is) and the largest rho on the grid of points points from
+#a to b, streamed through streamGrid so memory use doesn't depend on points. Returns a dict.
+#Moments are divided by the norm, so psi doesn't have to be normalised
+def streamReduce(psi,a,b,points,chunk=2**20,hasOut=False,dtype=float):
+    dx=(b-a)/(points-1) if points>1 else 0.0
+    sums=np.zeros(3)  #sum of rho, x rho and x^2 rho
+    ends=np.zeros(3)  #The same at the two end points, which the trapezium rule only counts half of
+    maxPsi=-1.0
+    xAtMax=np.nan
+    maxRho=0.0
+    work=None
+    for x,values,rho in streamGrid(psi,a,b,points,chunk,hasOut,dtype):
+        if work is None:
+            work=np.empty_like(rho)
+        w=work[:x.size]
+        np.multiply(x,rho,out=w)
+        sums+=[rho.sum(),w.sum(),np.dot(w,x)]
+        if x[0]==a:
+            ends+=[rho[0],x[0]*rho[0],x[0]**2*rho[0]]
+        if x[-1]==b:
+            ends+=[rho[-1],x[-1]*rho[-1],x[-1]**2*rho[-1]]
+        i=int(np.argmax(rho))  #|psi| is largest where rho is
+        if rho[i]>maxRho or maxPsi<0:
+            maxRho=float(rho[i])
+            maxPsi=float(np.sqrt(rho[i]))
+            xAtMax=float(x[i])
+    if points==1:  #No width to integrate over, the moments are those of the one point
+        return {"norm":0.0,"x":float(a),"x2":float(a)**2,"maxPsi":maxPsi,"xAtMax":xAtMax,"maxRho":maxRho}
+    norm,first,second=(sums-0.5*ends)*dx
+    return {"norm":norm,"x":first/norm,"x2":second/norm,"maxPsi":maxPsi,"xAtMax":xAtMax,"maxRho":maxRho}
+
+
+#Stream infinitePsi over a grid of points points and report the time and the peak memory numpy allocated
+def benchmarkStreaming(points=10**8,n=3,chunk=2**20):
+    import time  #Only needed here
+    import tracemalloc
+    from wavefunctions import infinitePsi
+
+    tracemalloc.start()
+    start=time.perf_counter()
+    result=streamReduce(lambda x,out: infinitePsi(x,n,out=out),0,1,points,chunk,hasOut=True)
+    elapsed=time.perf_counter()-start
+    peak=tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("%d points in %.1f s, peak memory %.1f MB (the full grid would be %.0f MB per array)"
+          %(points,elapsed,peak/2**20,8*points/2**20))
+    print("norm-1=%.2e, <x>=%.15f, <x^2>=%.15f (exact %.15f)"
+          %(result["norm"]-1,result["x"],result["x2"],1/3-1/(2*n**2*np.pi**2)))
+
+
+if __name__=="__main__":
+    benchmarkStreaming()
@@ -0,0 +1,177 @@
+# Parameter sweeps over a process pool, with checkpoints so a killed sweep can carry on where it stopped
+#
+# A sweep is a kernel (one of the functions in kernels, picked by name so the workers can find it) and a grid of
+# parameter sets, e.g.
+#   runSweep("finiteWell",parameterGrid(U=np.linspace(1,100,1000),L=[0.25e-9,0.5e-9,1e-9]),"wellSweep")
+# Every kernel takes one parameter set as keyword arguments and returns a dict of numbers or arrays. A kernel
+# that has a vectorised version in chunkKernels is run a whole chunk at a time through that instead.
+#
+# The points are handed to a ProcessPoolExecutor in chunks. The first chunks are a single point each, and after
+# that the chunk size is set from the measured time per point so that each chunk takes about chunkSeconds:
+# long enough that the pool overhead doesn't matter, short enough that little is lost if the sweep is killed.
+# Each finished chunk is written by the main process as a new shard file (shard-000123.npz, written under a
+# temporary name and then renamed, so a shard is either complete or absent). Shards are never changed once
+# written. Restarting the same sweep in the same directory reads the shards, skips every point already in them
+# and only runs the rest. sweep.json records the kernel and a hash of the grid so a different sweep can't be
+# resumed by mistake.
+
+import numpy as np  #import the numpy library as np
+import os  #Import os for the files
+import json  #Import json for the sweep description
+import time  #Import time to measure the chunks
+import hashlib  #Import hashlib for the grid hash
+import itertools  #Import itertools for the grid
+import concurrent.futures  #Import concurrent.futures for the process pool
+
+
+# ### The kernels
+
+#Every bound state energy (eV) of the finite well U (eV), L (m) for a particle of mass m (kg), by default the
+#electron mass scipy.constants.electron_mass as in the notebooks
+def finiteWellKernel(U,L,m=None):
+    return finiteWellChunk([{"U":U,"L":L,"m":m}])[0]
+
+#finiteWellKernel for a whole chunk of parameter sets at once, with one call to findBoundStatesBatch
+def finiteWellChunk(points):
+    import scipy.constants
+    from finiteWell import findBoundStatesBatch
+    U=[p["U"] for p in points]
+    L=[p["L"] for p in points]
+    m=[scipy.constants.electron_mass if p.get("m") is None else p["m"] for p in points]
+    EArray,nStates=findBoundStatesBatch(U,L,m)
+    return [{"E":E[:n]} for E,n in zip(EArray,nStates)]
+
+#The hydrogen density in the x-z plane (y=0) out to plotMax Bohr radii, and the radial expectation <r>
+def hydrogenDensityKernel(n,l,m,plotMax=30,points=128):
+    from hydrogenGrid import densitySlab
+    axis=np.linspace(-plotMax,plotMax,points)
+    return {"rho":densitySlab(axis,np.zeros(1),axis,n,l,m)[:,0,:],"meanR":(3*n*n-l*(l+1))/2}
+
+#Norm, <x>, <x^2>, <p^2> and Delta x Delta p of the normalised psiq4 of bonusWavefunctions.py
+def psiq4Kernel(a,b):
+    from wavefunctions import psiq4
+    from observables import observables
+    A=np.sqrt(3/b)
+    result=observables(lambda x: psiq4(A,x,a,b),0,b,breaks=[a])
+    return {key:result[key] for key in ("norm","x","x2","p2","uncertainty")}
+
+kernels={"finiteWell":finiteWellKernel,"hydrogenDensity":hydrogenDensityKernel,"psiq4":psiq4Kernel}
+
+#Kernels which can do a whole chunk in one go, taking the list of parameter sets and returning the list of results
+chunkKernels={"finiteWell":finiteWellChunk}
+
+
+# ### The grid
+
+#Every combination of the values given for each parameter, as a list of dicts (the last parameter changes fastest)
+def parameterGrid(**axes):
+    names=list(axes)
+    return [dict(zip(names,values)) for values in itertools.product(*(list(np.atleast_1d(v)) for v in axes.values()))]
+
+#Numbers from numpy arrays come out as numpy scalars, turn them back into plain Python values for json
+def plainParams(params):
+    return {k:(v.item() if isinstance(v,np.generic) else v) for k,v in params.items()}
+
+#A hash of the kernel name and the whole grid, in order
+def sweepHash(kernel,grid):
+    return hashlib.sha256(json.dumps([kernel,[plainParams(p) for p in grid]],sort_keys=True).encode()).hexdigest()
+
+
+# ### Shards
+
+#Write one chunk of results as a new shard. Results are stored as "index:name" arrays in an npz file
+def writeShard(directory,shard,results):
+    arrays={}
+    for index,result in results:
+        for name,value in result.items():
+            arrays["%d:%s"%(index,name)]=np.asarray(value)
+    path=os.path.join(directory,"shard-%06d.npz"%shard)
+    temporary=os.path.join(directory,".tmp-shard-%06d.npz"%shard)
+    np.savez(temporary,**arrays)
+    os.replace(temporary,path)
+
+#Every result in the shards in directory, as a dict from point index to the kernel's dict
+def readShards(directory):
+    results={}
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("shard-") and name.endswith(".npz")):
+            continue
+        with np.load(os.path.join(directory,name)) as shard:
+            for key in shard.files:
+                index,field=key.split(":",1)
+                results.setdefault(int(index),{})[field]=shard[key]
+    return results
+
+
+#Run the kernel on a list of (index, params), in a worker. Returns the results and the time taken
+def runChunk(kernel,chunk):
+    start=time.perf_counter()
+    if kernel in chunkKernels:
+        results=list(zip([index for index,params in chunk],chunkKernels[kernel]([params for index,params in chunk])))
+    else:
+        results=[(index,kernels[kernel](**params)) for index,params in chunk]
+    return results,time.perf_counter()-start
+
+
+#Run (or carry on) the sweep of kernel over grid, checkpointing into directory.
+#  workers      - number of processes (default one per core; 1 runs everything in this process)
+#  chunkSeconds - the time each chunk should take once the time per point is known
+#Returns a list with the result dict of every grid point, in grid order
+def runSweep(kernel,grid,directory,workers=None,chunkSeconds=10.0,maxChunk=10000,verbose=False):
+    os.makedirs(directory,exist_ok=True)
+    description={"kernel":kernel,"points":len(grid),"hash":sweepHash(kernel,grid)}
+    descriptionFile=os.path.join(directory,"sweep.json")
+    if os.path.exists(descriptionFile):
+        with open(descriptionFile) as f:
+            if json.load(f)!=description:
+                raise ValueError(directory+" holds a different sweep")
+    else:
+        with open(descriptionFile,"w") as f:
+            json.dump(description,f)
+
+    results=readShards(directory)
+    todo=[(i,plainParams(p)) for i,p in enumerate(grid) if i not in results]
+    shard=1+max([int(name[6:12]) for name in os.listdir(directory) if name.startswith("shard-")]+[0])
+    if verbose:
+        print("%d of %d points already done"%(len(results),len(grid)))
+
+    workers=os.cpu_count() if workers is None else workers
+    perPoint=None  #Seconds per point, a running average once the first chunks are back
+    def nextChunk():
+        size=1 if perPoint is None else int(min(maxChunk,max(1,chunkSeconds/max(perPoint,1e-9))))
+        chunk=todo[:size]
+        del todo[:size]
+        return chunk
+
+    def finished(chunkResults,elapsed):
+        nonlocal shard,perPoint
+        writeShard(directory,shard,chunkResults)
+        shard+=1
+        for index,result in chunkResults:
+            results[index]={k:np.asarray(v) for k,v in result.items()}
+        pointTime=elapsed/len(chunkResults)
+        perPoint=pointTime if perPoint is None else 0.7*perPoint+0.3*pointTime
+        if verbose:
+            print("%d of %d points done"%(len(results),len(grid)))
+
+    if workers<=1:
+        while todo:
+            finished(*runChunk(kernel,nextChunk()))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            running=set()
+            while todo or running:
+                while todo and len(running)<2*workers:  #Keep every worker busy with one chunk queued behind it
+                    running.add(pool.submit(runChunk,kernel,nextChunk()))
+                done,running=concurrent.futures.wait(running,return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    finished(*future.result())
+    return [results[i] for i in range(len(grid))]
+
+
+#The description (kernel, number of points, hash) and the results so far of the sweep in directory,
+#for looking at a sweep that is still running
+def loadSweep(directory):
+    with open(os.path.join(directory,"sweep.json")) as f:
+        description=json.load(f)
+    return description,readShards(directory)
@@ -0,0 +1,148 @@
+# Transmission and reflection through any piecewise constant potential
+#
+# The potential is described the same way as finiteV: breakpoints b_0 < b_1 < ... < b_{N-1} and one constant
+# value per region, so values has len(breaks)+1 entries (the two outer ones are the leads). In region j
+#   psi(x) = A_j exp(i k_j (x-x_j)) + B_j exp(-i k_j (x-x_j))      k_j = sqrt(2m(E-V_j))/hbar
+# where x_j is the left edge of region j (b_0 for the first region). Below the top of a region k_j=i kappa_j, so
+# the same formula covers the evanescent parts. Matching psi and psi' at each breakpoint gives
+#   (A_{j+1},B_{j+1}) = 1/2 [[1+r, 1-r],[1-r, 1+r]] (A_j e^{i k_j d_j}, B_j e^{-i k_j d_j})     r=k_j/k_{j+1}
+# with d_j the width of region j. Multiplying these 2x2 matrices from left to right gives the transfer matrix M.
+# For a particle coming in from the left (A_0=1, B_0=r, A_N=t, B_N=0)
+#   r = -M_10/M_11        t = det(M)/M_11 = (k_0/k_N)/M_11
+#   T = Re(k_N)/Re(k_0) |t|^2        R = |r|^2
+#
+# Every matrix entry is an array over energies and the loop is only over the regions, so a sweep over 10^6
+# energies is a handful of vectorised operations per region rather than a Python loop over energies.
+#
+# Units follow the notebook: energies and potentials in eV, positions in m and the mass in kg.
+# Very wide, very high barriers (kappa d above about 700) overflow the growing exponential.
+
+import numpy as np  #import the numpy library as np
+import scipy.constants #Import scipy.constants so that hbar and eV can be used
+
+from fastPiecewise import regionEdges  #Slices of a sorted grid for each region
+
+
+#Breaks and values for the finite well of finiteSquareWell.py, V=U outside 0 <= x <= L
+def wellRegions(U,L):
+    return [0,L],[U,0,U]
+
+#Breaks and values for count barriers of height U and width barrierWidth separated by wells of width wellWidth,
+#starting at x=0. Two barriers make the usual resonant tunnelling diode
+def barrierRegions(U,barrierWidth,wellWidth,count=2):
+    breaks=[]
+    values=[0]
+    for i in range(count):
+        start=i*(barrierWidth+wellWidth)
+        breaks+=[start,start+barrierWidth]
+        values+=[U,0]
+    return breaks,values
+
+
+#The wavenumber k_j in every region for every energy, an array of shape (len(values),len(E)).
+#Below the top of a region k_j=i kappa_j. At E exactly equal to a V_j k_j would be zero and the matching
+#conditions singular, so it is nudged by a rounding error sized amount
+def regionWavenumbers(E,values,m):
+    E=np.atleast_1d(np.asarray(E,dtype=float))
+    values=np.asarray(values,dtype=float)
+    scale=np.sqrt(2*m*scipy.constants.eV)/scipy.constants.hbar  #k for a kinetic energy of 1 eV
+    k=scale*np.sqrt((E[np.newaxis,:]-values[:,np.newaxis]).astype(complex))
+    k[k==0]=np.finfo(float).eps*scale
+    return k
+
+
+#Walk the transfer matrix from the left lead to the right one. Returns (k, M) with M of shape (2,2,len(E))
+def transferMatrix(E,breaks,values,m):
+    k=regionWavenumbers(E,values,m)
+    M=np.zeros((2,2,k.shape[1]),dtype=complex)
+    M[0,0]=M[1,1]=1
+    for j in range(len(breaks)):
+        if j>0:  #Cross region j from its left edge to its right edge
+            phase=np.exp(1j*k[j]*(breaks[j]-breaks[j-1]))
+            M[0]*=phase
+            M[1]/=phase
+        r=k[j]/k[j+1]
+        plus,minus=0.5*(1+r),0.5*(1-r)
+        M[0],M[1]=plus*M[0]+minus*M[1],minus*M[0]+plus*M[1]
+    return k,M
+
+
+#Transmission and reflection coefficients (T,R) for a particle coming in from the left at every energy in E.
+#T is zero wherever either lead is above E (nothing can come in or get out), and R is zero where the left one is.
+#Where both leads are open T+R=1
+def transmission(E,breaks,values,m):
+    k,M=transferMatrix(E,breaks,values,m)
+    r=-M[1,0]/M[1,1]
+    t=(k[0]/k[-1])/M[1,1]
+    with np.errstate(invalid="ignore",divide="ignore"):
+        T=np.where((k[0].real>0)&(k[-1].real>0),k[-1].real/k[0].real*np.abs(t)**2,0.0)
+    R=np.where(k[0].real>0,np.abs(r)**2,0.0)
+    return T,R
+
+
+#The amplitudes (A_j,B_j) in every region for an incoming wave exp(i k_0 (x-b_0)) from the left.
+#Returns (k, A, B), each of shape (len(values),len(E))
+def regionAmplitudes(E,breaks,values,m):
+    k,M=transferMatrix(E,breaks,values,m)
+    A=np.empty_like(k)
+    B=np.empty_like(k)
+    A[0]=1
+    B[0]=-M[1,0]/M[1,1]
+    for j in range(len(breaks)):
+        a,b=A[j],B[j]
+        if j>0:
+            phase=np.exp(1j*k[j]*(breaks[j]-breaks[j-1]))
+            a,b=a*phase,b/phase
+        r=k[j]/k[j+1]
+        A[j+1]=0.5*((1+r)*a+(1-r)*b)
+        B[j+1]=0.5*((1-r)*a+(1+r)*b)
+    return k,A,B
+
+
+#The complex scattering wavefunction on the sorted grid x for every energy in E, shape (len(E),len(x)).
+#The incoming wave has unit amplitude, so |psi|^2 is 1+R+interference on the left and T k_0/k_N on the right
+def unboundPsi(x,E,breaks,values,m):
+    x=np.asarray(x,dtype=float)
+    k,A,B=regionAmplitudes(E,breaks,values,m)
+    origins=[breaks[0]]+list(breaks)  #x_j, the left edge of region j (b_0 for the first region)
+    psi=np.empty((k.shape[1],x.size),dtype=complex)
+    edges=regionEdges(x,breaks,["left"]*len(breaks))  #psi is continuous, so which side owns b doesn't matter
+    for j in range(len(values)):
+        start,stop=edges[j],edges[j+1]
+        if stop<=start:
+            continue
+        wave=np.exp(1j*np.outer(k[j],x[start:stop]-origins[j]))
+        psi[:,start:stop]=A[j][:,np.newaxis]*wave+B[j][:,np.newaxis]/wave
+    return psi
+
+
+#Check against the textbook single barrier, T=1/(1+U^2 sin^2(k a)/(4E(E-U))) above the barrier and
+#1/(1+U^2 sinh^2(kappa a)/(4E(U-E))) below it, and check T+R=1 and that psi and psi' match at every breakpoint
+def validateTransfer(energies=10**6):
+    m=scipy.constants.electron_mass
+    U,a=25,0.5e-9
+    E=np.linspace(0.01,200,energies)
+    breaks,values=[0,a],[0,U,0]
+    T,R=transmission(E,breaks,values,m)
+    kBarrier=np.sqrt(2*m*np.abs(E-U)*scipy.constants.eV)/scipy.constants.hbar
+    with np.errstate(invalid="ignore",divide="ignore"):
+        s=np.where(E>U,np.sin(kBarrier*a),np.sinh(kBarrier*a))
+        exact=1/(1+U**2*s**2/(4*E*np.abs(E-U)))
+    print("Single barrier: max T error %.2e, max |T+R-1| %.2e"%(np.max(np.abs(T-exact)),np.max(np.abs(T+R-1))))
+
+    breaks,values=barrierRegions(0.3,2e-9,5e-9,count=3)
+    E=np.linspace(0.01,1,1000)
+    k,A,B=regionAmplitudes(E,breaks,values,m)
+    widths=np.diff(np.concatenate([[breaks[0]],breaks]))  #Region j runs from x_j to x_j+widths[j]
+    mismatch=0
+    for j in range(len(breaks)):  #psi and psi'/k_{j+1} at b_j from both sides
+        phase=np.exp(1j*k[j]*widths[j])
+        left=A[j]*phase+B[j]/phase
+        leftSlope=(A[j]*phase-B[j]/phase)*k[j]/k[j+1]
+        mismatch=max(mismatch,np.max(np.abs(left-A[j+1]-B[j+1])),np.max(np.abs(leftSlope-A[j+1]+B[j+1])))
+    T,R=transmission(E,breaks,values,m)
+    print("Triple barrier: max |T+R-1| %.2e, max matching error %.2e"%(np.max(np.abs(T+R-1)),mismatch))
+
+
+if __name__=="__main__":
+    validateTransfer()
@@ -0,0 +1,246 @@
+# The wavefunctions of the notebooks as a library, without the plots
+#
+# The notebook scripts import matplotlib and half of scipy at the top and draw every figure as they go, so
+# importing one of them to get at infinitePsi takes seconds. This module has the same functions with the same
+# arguments, and imports nothing heavier than numpy when it is loaded. Each piecewise function has a *Regions
+# companion returning its breaks, sides and funcs for piecewiseEval, so integrators (observables.regionMoments)
+# can work region by region with the same definition. The finite well and hydrogen functions
+# import their helper modules (and through them scipy.constants) the first time they are called, so a worker
+# process only pays for what it uses.
+#
+# infinitePsi, finitePsi and the hydrogen functions take a dtype, which is a numpy dtype or one of the names in
+# precisionPolicy: "compute" (the default, float64) for normalisations and expectation values, and "plot"
+# (float32) for arrays that only end up in a figure, which halves their memory and bandwidth. Change the policy
+# to change every caller at once, e.g. precisionPolicy["plot"]=np.float64. checkPrecision checks that the float32
+# figures come out the same as the float64 ones at 150 dpi.
+#
+# python wavefunctions.py prints how long each module takes to import in a fresh interpreter.
+
+import numpy as np  #import the numpy library as np
+import math  #Import math so that math.pi can be used
+
+from fastPiecewise import piecewiseEval  #A faster version of np.piecewise
+
+
+#What each kind of work is done in
+precisionPolicy={"compute":np.float64,"plot":np.float32}
+
+#The numpy dtype for a dtype argument: None means "compute", names are looked up in precisionPolicy
+def policyDtype(dtype=None):
+    dtype="compute" if dtype is None else dtype
+    return np.dtype(precisionPolicy.get(dtype,dtype) if isinstance(dtype,str) else dtype)
+
+
+#Infinite square well of width 1 (infiniteSquareWell.py)
+def infiniteV(x,out=None):
+    return piecewiseEval(x,[0,1],["left","right"],[1000,0,1000],out=out)
+
+#The constants are Python floats so that a float32 x stays float32 (numpy scalars would promote it to float64)
+def infinitePsiRegions(n):
+    k=float(n)*math.pi
+    return [0,1],["left","right"],[0,lambda x: math.sqrt(2)*np.sin(k*x),0]
+
+#An out array sets the precision itself, otherwise x is converted to the dtype first
+def infinitePsi(x,n,out=None,dtype=None):
+    x=np.asarray(x,dtype=policyDtype(dtype) if out is None else out.dtype)
+    return piecewiseEval(x,*infinitePsiRegions(n),out=out)
+
+
+#Finite square well, E and U in eV, L in m and m in kg (finiteSquareWell.py). D=None gives the normalised state
+def finitePsiRegions(D,E,U,L,m):
+    from finiteWell import boundStateRegions
+    return boundStateRegions(D,E,U,L,m)
+
+def finitePsi(x,D,E,U,L,m,out=None,dtype=None):
+    x=np.asarray(x,dtype=policyDtype(dtype) if out is None else out.dtype)
+    return piecewiseEval(x,*finitePsiRegions(D,E,U,L,m),out=out)
+
+
+#The bonus question wavefunctions (bonusWavefunctions.py)
+def cos2pixoverLRegions(A,L):
+    return [-L/4,L/4],["left","right"],[0,lambda x: A*np.cos(2*math.pi*x/L),0]
+
+def cos2pixoverL(A,x,L,out=None):
+    return piecewiseEval(x,*cos2pixoverLRegions(A,L),out=out)
+
+def psiq4Regions(A,a,b):
+    return [0,a,b],["left","left","right"],[0,lambda x: A*x/a,lambda x: A*(b-x)/(b-a),0]
+
+def psiq4(A,x,a,b,out=None):
+    return piecewiseEval(x,*psiq4Regions(A,a,b),out=out)
+
+#The question 3 candidates, written into out if it is given (so streaming.streamGrid can reuse its buffers)
+def psiq3Exp(N,x,s,power,out=None):
+    out=np.empty(np.shape(x)) if out is None else out
+    np.power(x,power,out=out)
+    out*=s
+    np.exp(out,out=out)
+    out*=N
+    return out
+
+def psiq3a(N,x,a,out=None):
+    return psiq3Exp(N,x,a,2,out)
+
+def psiq3b(N,x,a,out=None):
+    return psiq3Exp(N,x,-a,2,out)
+
+def psiq3c(N,x,a,out=None):
+    out=psiq3Exp(N,x,-a,2,out)
+    out/=3-np.asarray(x)
+    return out
+
+def psiq3d(N,x,a,out=None):
+    return psiq3Exp(N,x,a,1,out)
+
+def psiq3e(N,x,a,out=None):
+    return psiq3Exp(N,x,-a,1,out)
+
+
+#Hydrogen, distances in Bohr radii (hydrogenWavefunction.py)
+def radialHydrogenPsi(r,n,l,dtype=None):
+    from hydrogen import radialPsi
+    return radialPsi(r,n,l,policyDtype(dtype))
+
+def radialHydrogenrSqRho(r,n,l,dtype=None):
+    r=np.asarray(r,dtype=policyDtype(dtype))
+    return (r**2)*(radialHydrogenPsi(r,n,l,dtype)**2)
+
+def angularHydrogenRho(theta,phi,l,m,dtype=None):
+    from hydrogen import angularRhoCos
+    dtype=policyDtype(dtype)
+    return angularRhoCos(np.cos(np.asarray(theta,dtype=dtype)),l,m,dtype)
+
+def totalHydrogenRho(r,theta,phi,n,l,m,dtype=None):
+    return radialHydrogenrSqRho(r,n,l,dtype)*angularHydrogenRho(theta,phi,l,m,dtype)
+
+
+#Draw each figure from float64 and from the "plot" precision at 150 dpi (as the notebooks set figure.dpi) and
+#compare them: the largest error as a fraction of the plotted range, how many pixels of the rendered images
+#differ and by how much at most (out of 255, antialiased edges move by a level or two). Then the peak memory and
+#time of infinitePsi, finitePsi and totalHydrogenRho on points^3 points in each precision.
+#Each figure passes if the error is below errorTol, no pixel changes by more than levelTol and at most changedTol
+#of the pixels change at all; each function passes if its "plot" peak memory is at most memoryTol of the float64
+#one. Raises AssertionError naming whatever failed, otherwise returns {name: (error, changed, largest change)}
+#for the figures and {name: plot peak/compute peak} for the memory
+def checkPrecision(points=128,dpi=150,errorTol=1e-6,levelTol=2,changedTol=1e-3,memoryTol=0.55):
+    import time  #Only needed here
+    import tracemalloc
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import scipy.constants
+    from finiteWell import findBoundStates
+
+    m=scipy.constants.electron_mass
+    U,L=25,0.5e-9
+    E=findBoundStates(U,L,m)
+    x=np.linspace(-0.25,1.25,1000)
+    xFinite=np.linspace(-L,2*L,1000)
+    r=np.linspace(0,60,1000)
+    axis=np.linspace(-30,30,300)
+    X,Y=np.meshgrid(axis,axis)
+    rSlice=np.sqrt(X**2+Y**2)
+    thetaSlice=np.arctan2(np.abs(X),Y)  #The x-z plane, with z up the image
+    lines=[("infinitePsi n=%d"%n,x,lambda dtype,n=n: infinitePsi(x,n,dtype=dtype)) for n in (1,2,3,4)]
+    lines+=[("finitePsi n=%d"%(i+1),xFinite,lambda dtype,i=i: finitePsi(xFinite,None,E[i],U,L,m,dtype=dtype))
+            for i in range(len(E))]
+    lines+=[("radialHydrogenPsi %d,%d"%nl,r,lambda dtype,nl=nl: radialHydrogenPsi(r,*nl,dtype=dtype))
+            for nl in ((1,0),(3,1),(6,2),(8,3),(12,4))]
+    images=[("totalHydrogenRho %d,%d,%d"%nlm,lambda dtype,nlm=nlm: totalHydrogenRho(rSlice,thetaSlice,0,*nlm,dtype=dtype))
+            for nlm in ((2,1,0),(4,1,-1),(5,3,2))]
+
+    #The rendered pixels of the figure draw(ax) makes. Path simplification is off: it drops vertices that are
+    #within 1/9 of a pixel of the line, and which ones it drops can flip for any change in the data at all (even
+    #one float64 ulp), which would move a few hundred pixels by up to 8 levels whatever the precision
+    def render(draw):
+        with matplotlib.rc_context({"path.simplify":False}):
+            fig,ax=plt.subplots(dpi=dpi)
+            draw(ax)
+            fig.canvas.draw()
+            pixels=np.asarray(fig.canvas.buffer_rgba()).copy()
+            plt.close(fig)
+        return pixels
+
+    failures=[]
+    figures={}
+    print("%-26s %12s %16s %14s %s"%("function","error/range","pixels changed","largest change","dtype"))
+    for name,grid,f in lines+[(name,None,f) for name,f in images]:
+        exact,rounded=f("compute"),f("plot")
+        error=np.max(np.abs(rounded-exact))/np.ptp(exact)
+        if grid is None:
+            limits=(exact.min(),exact.max())  #The same colour scale for both, as fixed limits would be
+            draw=lambda y: (lambda ax: ax.imshow(y,interpolation="none",origin="lower",vmin=limits[0],vmax=limits[1]))
+        else:
+            limits=(exact.min()-0.05*np.ptp(exact),exact.max()+0.05*np.ptp(exact))
+            draw=lambda y: (lambda ax: (ax.plot(grid,y,linewidth=1),ax.set_ylim(*limits)))
+        difference=np.abs(render(draw(exact)).astype(int)-render(draw(rounded)))
+        changed=np.count_nonzero(difference.any(axis=-1))
+        passed=error<errorTol and difference.max()<=levelTol and changed<=changedTol*difference[...,0].size
+        print("%-26s %12.1e %16d %14d %s %s"%(name,error,changed,difference.max(),rounded.dtype,
+                                               "ok" if passed else "FAILED"))
+        figures[name]=(error,changed,int(difference.max()))
+        if not passed:
+            failures.append(name)
+
+    cube=np.linspace(-30,30,points)
+    X,Y,Z=np.meshgrid(cube,cube,cube,indexing="ij")
+    rCube=np.sqrt(X**2+Y**2+Z**2)
+    thetaCube=np.arctan2(np.sqrt(X**2+Y**2),Z)
+    del X,Y,Z
+    xLine=np.linspace(0,1,points**3)
+    xFiniteLine=np.linspace(0,L,points**3)
+    #Each is given its input already in the right dtype, so the peak is only what the evaluation itself allocates
+    memory=[("infinitePsi",lambda dtype,x: infinitePsi(x,3,dtype=dtype),(xLine,)),
+            ("finitePsi",lambda dtype,x: finitePsi(x,None,E[1],U,L,m,dtype=dtype),(xFiniteLine,)),
+            ("totalHydrogenRho",lambda dtype,r,theta: totalHydrogenRho(r,theta,0,4,2,1,dtype=dtype),(rCube,thetaCube))]
+    ratios={}
+    for name,f,inputs in memory:
+        peaks=[]
+        for precision in ("compute","plot"):
+            converted=[a.astype(policyDtype(precision)) for a in inputs]
+            tracemalloc.start()
+            start=time.perf_counter()
+            f(precision,*converted)
+            elapsed=time.perf_counter()-start
+            peak=tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            peaks.append(peak)
+            print("%d^3 points of %s in %s: peak %.1f MB, %.1f ms"
+                  %(points,name,policyDtype(precision),peak/2**20,1000*elapsed))
+        ratios[name]=peaks[1]/peaks[0]
+        if ratios[name]>memoryTol:
+            failures.append(name+" memory")
+    if failures:
+        raise AssertionError("The plot precision is outside tolerance for "+", ".join(failures))
+    return figures,ratios
+
+#The modules worth timing, cheapest first
+importModules=("numpy","fastPiecewise","wavefunctions","scipy.constants","finiteWell","hydrogen","observables",
+               "transferMatrix","scipy.optimize","scipy.special","scipy.integrate","matplotlib.pyplot",
+               "finiteSquareWell")
+
+#The time to import each module in a fresh interpreter, less the time to start one, in ms (the best of
+#repeats tries). The notebook scripts also draw all their figures, so for those this is the whole run
+def benchmarkImports(modules=importModules,repeats=5):
+    import os  #Only needed here
+    import subprocess
+    import sys
+    import time
+
+    def best(code):
+        times=[]
+        for i in range(repeats):
+            start=time.perf_counter()
+            subprocess.run([sys.executable,"-c",code],check=True,env=dict(os.environ,MPLBACKEND="Agg"),
+                           stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+            times.append(time.perf_counter()-start)
+        return min(times)
+
+    startup=best("pass")
+    print("%-20s %10s"%("module","time (ms)"))
+    for module in modules:
+        print("%-20s %10.1f"%(module,1000*(best("import "+module)-startup)))
+
+
+if __name__=="__main__":
+    benchmarkImports()
@@ -0,0 +1,69 @@
+# Time dependent wavepackets made by adding up lots of waves
+#
+# A packet of plane waves with amplitudes a_j, wavenumbers k_j and angular frequencies omega_j is
+#   psi(t,x) = sum_j a_j exp(i (k_j x - omega_j t))
+# For a grid of times and positions this is a matrix product: the (times x waves) matrix a_j exp(-i omega_j t)
+# times the (waves x positions) matrix exp(i k_j x). So the whole (t,x) field comes from a single BLAS call
+# rather than a Python loop over waves, and the same works for a superposition of any stationary states.
+#
+# Units: hbar=m=1 unless you pass your own omega, so a free particle has omega=k^2/2.
+
+import numpy as np  #import the numpy library as np
+
+
+#Dispersion relation of a free particle, omega=hbar k^2/(2m) with hbar=m=1
+def freeParticleOmega(k):
+    return 0.5*k**2
+
+
+#The default amount of memory for one block of exp(i k x) values, in bytes
+blockBytes=64*2**20
+
+
+#Add up plane waves a_j exp(i (k_j x - omega_j t)) at every time in t and position in x.
+#  omega - a function of k (default freeParticleOmega) or an array with one frequency per wave
+#  amps  - the amplitudes a_j (default all equal to 1/len(k))
+#Returns a complex array of shape (len(t),len(x)). The waves are processed in blocks so that the
+#exp(i k x) matrix never takes more than memoryBytes
+def planeWavePacket(x,t,k,omega=freeParticleOmega,amps=None,memoryBytes=blockBytes):
+    x=np.asarray(x,dtype=float)
+    t=np.atleast_1d(np.asarray(t,dtype=float))
+    k=np.atleast_1d(np.asarray(k,dtype=float))
+    omega=omega(k) if callable(omega) else np.broadcast_to(np.asarray(omega,dtype=float),k.shape)
+    amps=np.full(k.shape,1.0/k.size) if amps is None else np.broadcast_to(np.asarray(amps),k.shape)
+    psi=np.zeros((t.size,x.size),dtype=complex)
+    block=max(1,int(memoryBytes//(16*max(x.size,1))))  #How many waves fit into one block
+    for start in range(0,k.size,block):
+        stop=min(start+block,k.size)
+        timePart=amps[start:stop]*np.exp(-1j*np.outer(t,omega[start:stop]))  #(times x waves)
+        spacePart=np.exp(1j*np.outer(k[start:stop],x))  #(waves x positions)
+        psi+=timePart@spacePart
+    return psi
+
+
+#Superpose stationary states, psi(t,x) = sum_j c_j phi_j(x) exp(-i E_j t/hbar).
+#states is an array of shape (number of states, len(x)) holding phi_j(x), e.g. infinitePsi for n=1,2,3...
+#Returns a complex array of shape (len(t),len(x)) from a single matrix product
+def eigenPacket(states,energies,coeffs,t,hbar=1.0):
+    t=np.atleast_1d(np.asarray(t,dtype=float))
+    energies=np.asarray(energies,dtype=float)
+    timePart=np.asarray(coeffs)*np.exp(-1j*np.outer(t,energies)/hbar)
+    return timePart@np.asarray(states)
+
+
+#The same as planeWavePacket for evenly spaced wavenumbers k_j=k0+j dk, done with one batched FFT.
+#With points x values (at least len(amps)) the packet is evaluated on x_n=n dx with dx=2 pi/(points dk),
+#one full period 2 pi/dk of the packet. Returns (x,psi) with psi of shape (len(t),points)
+def fftPacket(k0,dk,amps,t,omega=freeParticleOmega,points=None):
+    amps=np.asarray(amps)
+    t=np.atleast_1d(np.asarray(t,dtype=float))
+    points=amps.size if points is None else points
+    k=k0+dk*np.arange(amps.size)
+    omega=omega(k) if callable(omega) else np.asarray(omega,dtype=float)
+    coeffs=np.zeros((t.size,points),dtype=complex)  #Zero padding beyond the last wave gives a finer x grid
+    coeffs[:,:amps.size]=amps*np.exp(-1j*np.outer(t,omega))
+    x=np.arange(points)*2*np.pi/(points*dk)
+    #sum_j c_j exp(i (k0+j dk) x_n) = exp(i k0 x_n) * points * ifft(c)_n
+    psi=np.fft.ifft(coeffs,axis=1)
+    psi*=points*np.exp(1j*k0*x)
+    return x,psi